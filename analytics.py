@@ -0,0 +1,113 @@
+"""Spending breakdowns by category, week and month, computed with NumPy and pandas.
+
+All of them start from expense_frame(): the (day, category, amount) columns
+of every expense, read in one query straight into NumPy arrays. The frame
+and each breakdown are cached until the next write, so switching views
+costs one bincount over the cached columns, and nothing once it was seen.
+Cached frames are shared between reruns: treat them as read-only.
+"""
+import numpy as np
+import pandas as pd
+
+from storage import cached_read, connection
+
+NO_DAY = np.iinfo(np.int32).min  # undated rows: in the category totals, not on the timeline
+FREQUENCIES = ('week', 'month')
+TREND_WINDOW = {'week': 4, 'month': 3}  # buckets in the rolling average
+
+# Days since the epoch, the category as an index into the categories list, and the amount.
+# Categories come from the rollup table; an expense whose category is missing from it maps to NULL.
+FRAME_SQL = '''
+SELECT ifnull(CAST(julianday(date) - 2440587.5 AS INTEGER), {no_day}), CASE ifnull(category, '') {cases} END, ifnull(amount, 0)
+FROM expenses
+'''
+FRAME_DTYPE = [('day', 'i4'), ('code', 'i4'), ('amount', 'f8')]
+
+
+@cached_read
+def expense_frame():
+    """Every expense as a DataFrame with ``day`` (datetime64, NaT if undated), ``category`` and ``amount``."""
+    with connection() as conn:
+        categories = [row[0] for row in conn.execute('SELECT DISTINCT category FROM monthly_rollup ORDER BY 1')]
+        cases = ' '.join(f'WHEN ? THEN {code}' for code in range(len(categories))) or 'WHEN NULL THEN 0'
+        sql = FRAME_SQL.format(no_day=NO_DAY, cases=f'{cases} ELSE -1')
+        # fromiter fills the typed columns as rows arrive: no list of tuples in between
+        columns = np.fromiter(conn.execute(sql, categories), dtype=FRAME_DTYPE)
+    days = columns['day'].astype('datetime64[D]')
+    days[columns['day'] == NO_DAY] = np.datetime64('NaT')
+    return pd.DataFrame({
+        'day': days,
+        'category': pd.Categorical.from_codes(columns['code'], categories or ['']),
+        'amount': columns['amount'],
+    })
+
+
+def _bucket_numbers(days, frequency):
+    """Each day's week (weeks start on Monday) or month, numbered consecutively from the epoch's."""
+    day_numbers = days.astype(np.int64)
+    if frequency == 'week':
+        return (day_numbers + 3) // 7  # 1970-01-01 was a Thursday
+    if frequency == 'month':
+        return days.astype('datetime64[M]').astype(np.int64)
+    raise ValueError(f'unknown frequency {frequency!r}, expected one of {FREQUENCIES}')
+
+
+def _bucket_starts(first, count, frequency):
+    if frequency == 'week':
+        return pd.DatetimeIndex((np.arange(first, first + count) * 7 - 3).astype('datetime64[D]'))
+    return pd.DatetimeIndex(np.arange(first, first + count).astype('datetime64[M]').astype('datetime64[D]'))
+
+
+@cached_read
+def by_category():
+    """Total, count and share of all spending per category, largest first."""
+    frame = expense_frame()
+    codes, categories = frame['category'].cat.codes.to_numpy(), frame['category'].cat.categories
+    known = codes >= 0
+    totals = np.bincount(codes[known], weights=frame['amount'].to_numpy()[known], minlength=len(categories))
+    counts = np.bincount(codes[known], minlength=len(categories))
+    grouped = pd.DataFrame({'total': totals, 'count': counts}, index=pd.Index(categories, name='category'))
+    grouped = grouped[grouped['count'] > 0].sort_values('total', ascending=False)
+    total = grouped['total'].sum()
+    grouped['share'] = grouped['total'] / total if total else 0.0
+    return grouped
+
+
+@cached_read
+def by_period(frequency='month'):
+    """Spending per week or month (rows, oldest first) and category (columns); empty buckets are 0.
+
+    One bincount over (bucket, category) pairs does the group-by, and it
+    yields every bucket between the first and the last, so a week or month
+    without expenses is a 0 on the chart rather than a gap.
+    """
+    frame = expense_frame()
+    codes, categories = frame['category'].cat.codes.to_numpy(), frame['category'].cat.categories
+    days = frame['day'].to_numpy()
+    keep = ~np.isnat(days) & (codes >= 0)
+    if not keep.any():
+        return pd.DataFrame(columns=categories, dtype=float)
+    buckets = _bucket_numbers(days[keep].astype('datetime64[D]'), frequency)
+    first = buckets.min()
+    count = int(buckets.max() - first) + 1
+    sums = np.bincount((buckets - first) * len(categories) + codes[keep],
+                       weights=frame['amount'].to_numpy()[keep], minlength=count * len(categories))
+    table = pd.DataFrame(sums.reshape(count, len(categories)), columns=categories,
+                         index=_bucket_starts(first, count, frequency))
+    table.index.name = frequency
+    table.columns.name = 'category'
+    return table
+
+
+@cached_read
+def trend(frequency='month', window=None):
+    """Total per bucket, its rolling mean, and the least-squares slope per bucket.
+
+    Returns ``(frame, slope)`` where ``frame`` has ``total`` and ``average``
+    columns indexed like by_period().
+    """
+    totals = by_period(frequency).sum(axis=1)
+    window = window or TREND_WINDOW[frequency]
+    frame = pd.DataFrame({'total': totals, 'average': totals.rolling(window, min_periods=1).mean()})
+    slope = float(np.polyfit(np.arange(len(totals)), totals.to_numpy(), 1)[0]) if len(totals) > 1 else 0.0
+    return frame, slope
@@ -0,0 +1,427 @@
+"""Small async JSON API over the same databases as the Streamlit UI.
+
+    POST   /expenses        {"name", "amount", "category"?, "period"?, "date"?}
+    DELETE /expenses/<id>
+    GET    /expenses?period=Month&before_id=&limit=
+    POST   /eid             {"giver", "amount", "date"?}
+    GET    /eid/givers?after=&limit=    (or ?top=5: the biggest givers)
+    GET    /eid/years
+    GET    /totals?period=Month
+    GET    /settings
+    PATCH  /settings        {"font": "Courier", ...}
+
+A household is picked with ?household= or an X-Household header, the id
+the UI derives from the signed-in user, and every request carries one of
+its tokens as ``Authorization: Bearer <token>`` (see tokens.py; the
+Settings page issues them). Bodies must be sent as application/json: a
+page in the browser can't send that, or the header, to another origin
+without a preflight, which is never answered. It listens on 127.0.0.1
+unless RIYAL_API_HOST says otherwise (a phone on the home network). Run it
+with ``python api.py`` or inside the Streamlit process with RIYAL_API=1.
+"""
+import asyncio
+import dataclasses
+import datetime
+import json
+import os
+import re
+import threading
+from contextlib import asynccontextmanager, nullcontext
+from urllib.parse import parse_qs
+
+import aiosqlite
+
+import storage
+from options import CATEGORIES, PERIODS
+from settings import get_settings, update_settings
+from storage import (AGGREGATE_BUMP_SQL, AGGREGATE_SEED_SQL, AGGREGATE_SQL, BUSY_TIMEOUT_MS, DEFAULT_CATEGORY,
+                     DEFAULT_PERIOD, EID_AGGREGATE, EID_BY_YEAR_SQL, GIVERS_PAGE_SQL, INSERT_EID_SQL,
+                     INSERT_EXPENSE_SQL, PAGE_EXPENSES_SQL, PAGE_SIZE, SUMMARY_GIVERS, TOP_GIVERS_SQL,
+                     expense_aggregate, giver_summary)
+from tokens import CHECK_TOKEN_SQL, token_hash
+
+ENABLED = os.environ.get('RIYAL_API', '') not in ('', '0')
+HOST = os.environ.get('RIYAL_API_HOST', '127.0.0.1')
+PORT = int(os.environ.get('RIYAL_API_PORT', '8765'))
+MAX_PAGE = 500
+MAX_BODY = 64 * 1024
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Database:
+    """One aiosqlite connection to a database file, opened on first use; statements on it run one request at a time."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.conn = None
+        self.lock = asyncio.Lock()
+        self.users = 0         # requests holding it right now
+        self.evicted = False   # its pool closed while in use: close once the last request is done
+
+    async def _connect(self):
+        # the sync pool runs the migrations, once per process, like for the UI
+        await asyncio.to_thread(self._migrate)
+        self.conn = await aiosqlite.connect(self.pool.path, isolation_level=None)
+        await self.conn.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+        await self.conn.execute('PRAGMA synchronous=NORMAL')
+
+    def _migrate(self):
+        with self.pool.connection():
+            pass
+
+    async def fetch(self, sql, params=()):
+        async with self.lock:
+            if self.conn is None:
+                await self._connect()
+            async with self.conn.execute(sql, params) as cursor:
+                return await cursor.fetchall()
+
+    @asynccontextmanager
+    async def transaction(self):
+        async with self.lock:
+            if self.conn is None:
+                await self._connect()
+            await self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield self.conn
+            except BaseException:
+                await self.conn.execute('ROLLBACK')
+                raise
+            await self.conn.execute('COMMIT')
+        self.pool.mark_changed()  # so the UI's cached reads see this write
+
+    async def close(self):
+        if self.conn is not None:
+            conn, self.conn = self.conn, None
+            await conn.close()
+
+
+class Databases:
+    """A Database per open pool: closed when storage closes the pool (an evicted household)."""
+
+    def __init__(self):
+        self._open = {}  # path -> Database
+        self._loop = None
+        storage.on_pool_close(self._pool_closed)
+
+    @asynccontextmanager
+    async def use(self, household):
+        pool = storage.tenants.get(household) if household else storage.get_pool()
+        self._loop = asyncio.get_running_loop()
+        db = self._open.get(pool.path)
+        if db is None:
+            db = self._open[pool.path] = Database(pool)
+        db.pool = pool  # a household reopened after an eviction has a new pool
+        db.users += 1
+        try:
+            yield db
+        finally:
+            db.users -= 1
+            if db.evicted and not db.users:
+                await db.close()
+
+    def _pool_closed(self, path):
+        # called on whichever thread closed the pool; the Databases belong to the event loop
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._evict, path)
+
+    def _evict(self, path):
+        db = self._open.pop(path, None)
+        if db is None:
+            return
+        if db.users:
+            db.evicted = True
+        else:
+            self._loop.create_task(db.close())
+
+    async def close(self):
+        for db in self._open.values():
+            await db.close()
+        self._open.clear()
+
+
+databases = Databases()
+
+
+# --- Validation ---
+def _text(body, field, default=None):
+    value = body.get(field, default)
+    if not isinstance(value, str) or not value.strip():
+        raise ApiError(400, f'{field} must be a non-empty string')
+    return value.strip()
+
+
+def _choice(body, field, choices, default):
+    value = body.get(field, default)
+    if value not in choices:
+        raise ApiError(400, f'{field} must be one of {", ".join(choices)}')
+    return value
+
+
+def _amount(body, field='amount'):
+    value = body.get(field)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+        raise ApiError(400, f'{field} must be a positive number')
+    return float(value)
+
+
+def _date(body):
+    value = body.get('date')
+    if value is None:
+        return datetime.date.today().isoformat()
+    try:
+        return datetime.date.fromisoformat(value).isoformat()
+    except (TypeError, ValueError):
+        raise ApiError(400, 'date must be YYYY-MM-DD') from None
+
+
+def _int(query, field, default):
+    if field not in query:
+        return default
+    try:
+        return int(query[field])
+    except ValueError:
+        raise ApiError(400, f'{field} must be an integer') from None
+
+
+# --- Handlers: (db, household, query, body) -> (status, payload) ---
+async def add_expense(db, household, query, body):
+    row = (_text(body, 'name'), _choice(body, 'category', CATEGORIES, DEFAULT_CATEGORY), _amount(body),
+           _choice(body, 'period', PERIODS, DEFAULT_PERIOD), _date(body))
+    async with db.transaction() as conn:
+        cursor = await conn.execute(INSERT_EXPENSE_SQL, row)
+        aggregate = expense_aggregate(row[3])
+        await conn.execute(AGGREGATE_SEED_SQL, (aggregate,))
+        await conn.execute(AGGREGATE_BUMP_SQL, (row[2], 1, aggregate))
+    return 201, {'id': cursor.lastrowid}
+
+
+async def remove_expense(db, household, query, body, expense_id):
+    async with db.transaction() as conn:
+        async with conn.execute('SELECT amount, period FROM expenses WHERE id=?', (expense_id,)) as cursor:
+            row = await cursor.fetchone()
+        if row is None:
+            raise ApiError(404, f'no expense {expense_id}')
+        await conn.execute('DELETE FROM expenses WHERE id=?', (expense_id,))
+        await conn.execute(AGGREGATE_BUMP_SQL, (-(row[0] or 0), -1, expense_aggregate(row[1])))
+    return 200, {'removed': expense_id}
+
+
+async def list_expenses(db, household, query, body):
+    period = query.get('period', DEFAULT_PERIOD)
+    before_id = _int(query, 'before_id', 2 ** 63 - 1)
+    limit = min(max(_int(query, 'limit', PAGE_SIZE), 1), MAX_PAGE)
+    rows = await db.fetch(PAGE_EXPENSES_SQL, (period, before_id, limit))
+    items = [{'id': r[0], 'name': r[1], 'category': r[2], 'amount': r[3], 'period': r[4], 'date': r[5]} for r in rows]
+    return 200, {'items': items, 'next_before_id': items[-1]['id'] if len(items) == limit else None}
+
+
+async def add_eid(db, household, query, body):
+    giver, amount, date = _text(body, 'giver'), _amount(body), _date(body)
+    async with db.transaction() as conn:
+        cursor = await conn.execute(INSERT_EID_SQL, (giver, amount, date))
+        await conn.execute(AGGREGATE_SEED_SQL, (EID_AGGREGATE,))
+        await conn.execute(AGGREGATE_BUMP_SQL, (amount, 1, EID_AGGREGATE))
+    return 201, {'id': cursor.lastrowid}
+
+
+def _givers(rows):
+    return [{'giver': r[0], 'count': r[1], 'amount': r[2], 'last_date': r[3]} for r in rows]
+
+
+async def list_givers(db, household, query, body):
+    """Givers by name, a page at a time; ?top=N instead returns the N who gave the most."""
+    if 'top' in query:
+        top = min(max(_int(query, 'top', 5), 1), MAX_PAGE)
+        return 200, {'items': _givers(await db.fetch(TOP_GIVERS_SQL, (top,)))}
+    after = query.get('after')
+    limit = min(max(_int(query, 'limit', PAGE_SIZE), 1), MAX_PAGE)
+    items = _givers(await db.fetch(GIVERS_PAGE_SQL, (after or '', after, limit)))
+    return 200, {'items': items, 'next_after': items[-1]['giver'] if len(items) == limit else None}
+
+
+async def eid_by_year(db, household, query, body):
+    rows = await db.fetch(EID_BY_YEAR_SQL)
+    return 200, {'items': [{'year': r[0], 'count': r[1], 'amount': r[2]} for r in rows]}
+
+
+async def totals(db, household, query, body):
+    period = query.get('period', DEFAULT_PERIOD)
+    expenses = await db.fetch(AGGREGATE_SQL, (expense_aggregate(period),))
+    eid = await db.fetch(AGGREGATE_SQL, (EID_AGGREGATE,))
+    top = await db.fetch(TOP_GIVERS_SQL, (SUMMARY_GIVERS,))
+    givers = (await db.fetch('SELECT COUNT(*) FROM eid_givers'))[0][0]
+    return 200, {'period': period, 'expenses': expenses[0][0] if expenses else 0, 'eid': eid[0][0] if eid else 0,
+                 'eid_givers': giver_summary([r[0] for r in top], givers - len(top))}
+
+
+def _in_household(household, fn, *args, **kwargs):
+    # runs on a worker thread; the settings module resolves the database through storage
+    with storage.use_tenant(household) if household else nullcontext():
+        return fn(*args, **kwargs)
+
+
+async def read_settings(db, household, query, body):
+    current = await asyncio.to_thread(_in_household, household, get_settings)
+    return 200, dataclasses.asdict(current)
+
+
+async def change_settings(db, household, query, body):
+    try:
+        await asyncio.to_thread(_in_household, household, update_settings, **body)
+    except (KeyError, TypeError, ValueError) as error:
+        raise ApiError(400, error.args[0] if error.args else 'invalid settings') from None
+    return await read_settings(db, household, query, body)
+
+
+ROUTES = [
+    ('POST', re.compile(r'/expenses'), add_expense),
+    ('GET', re.compile(r'/expenses'), list_expenses),
+    ('DELETE', re.compile(r'/expenses/(\d+)'), remove_expense),
+    ('POST', re.compile(r'/eid'), add_eid),
+    ('GET', re.compile(r'/eid/givers'), list_givers),
+    ('GET', re.compile(r'/eid/years'), eid_by_year),
+    ('GET', re.compile(r'/totals'), totals),
+    ('GET', re.compile(r'/settings'), read_settings),
+    ('PATCH', re.compile(r'/settings'), change_settings),
+]
+
+
+# --- ASGI ---
+async def _authorize(db, headers):
+    scheme, _, token = headers.get(b'authorization', b'').decode('latin-1').partition(' ')
+    if scheme.lower() != 'bearer' or not token.strip():
+        raise ApiError(401, 'a token is required: Authorization: Bearer <token>')
+    if not await db.fetch(CHECK_TOKEN_SQL, (token_hash(token.strip()),)):
+        raise ApiError(401, 'invalid token for this household')
+
+
+async def _body(receive, headers):
+    media_type = headers.get(b'content-type', b'').decode('latin-1').split(';')[0].strip().lower()
+    if media_type != 'application/json':
+        raise ApiError(415, 'body must be sent as application/json')
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY:
+            raise ApiError(413, 'request body too large')
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            break
+    raw = b''.join(chunks)
+    if not raw:
+        return {}
+    try:
+        body = json.loads(raw)
+    except ValueError:
+        raise ApiError(400, 'body must be JSON') from None
+    if not isinstance(body, dict):
+        raise ApiError(400, 'body must be a JSON object')
+    return body
+
+
+async def _respond(send, status, payload):
+    data = json.dumps(payload, ensure_ascii=False).encode()
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json; charset=utf-8'),
+                            (b'content-length', str(len(data)).encode())]})
+    await send({'type': 'http.response.body', 'body': data})
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await databases.close()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    """The ASGI application."""
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+    try:
+        path, method = scope['path'].rstrip('/') or '/', scope['method']
+        allowed = False
+        for route_method, pattern, handler in ROUTES:
+            match = pattern.fullmatch(path)
+            if match is None:
+                continue
+            allowed = True
+            if route_method == method:
+                break
+        else:
+            raise ApiError(405 if allowed else 404, 'method not allowed' if allowed else 'not found')
+        query = {key: values[-1] for key, values in parse_qs(scope['query_string'].decode()).items()}
+        headers = dict(scope['headers'])
+        household = query.pop('household', None) or headers.get(b'x-household', b'').decode() or None
+        if household:
+            try:
+                database = storage.tenants.path(household)
+            except ValueError as error:
+                raise ApiError(400, str(error)) from None
+            if not os.path.exists(database):
+                raise ApiError(401, 'invalid token for this household')  # and no file is created for it
+        async with databases.use(household) as db:
+            await _authorize(db, headers)
+            body = await _body(receive, headers) if method in ('POST', 'PATCH') else {}
+            status, payload = await handler(db, household, query, body, *(int(g) for g in match.groups()))
+    except ApiError as error:
+        status, payload = error.status, {'error': str(error)}
+    await _respond(send, status, payload)
+
+
+# --- Serving ---
+_server = None
+_server_lock = threading.Lock()
+
+
+def serve(host=HOST, port=PORT):
+    """Start uvicorn on a daemon thread once per process.
+
+    Returns the server once it accepts requests, or None if it could not
+    start (usually because another process already serves the port).
+    """
+    import time
+
+    import uvicorn
+
+    global _server
+    with _server_lock:
+        if _server is None:
+            server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level='warning',
+                                                   access_log=False))
+            thread = threading.Thread(target=server.run, name='api', daemon=True)
+            thread.start()
+            while not server.started and thread.is_alive():
+                time.sleep(0.01)
+            _server = server if server.started else False  # don't retry every rerun
+        return _server or None
+
+
+if __name__ == '__main__':
+    import argparse
+
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description='Riyal Tracker JSON API')
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--db', default=storage.DB_PATH)
+    args = parser.parse_args()
+
+    storage.configure(args.db)
+    uvicorn.run(app, host=args.host, port=args.port, log_level='warning', access_log=False)
@@ -1,101 +1,17 @@
 import streamlit as st
-import sqlite3
-import datetime
 
-# ------------------ Database Setup ------------------
-conn = sqlite3.connect("riyaltacker.db", check_same_thread=False)
-c = conn.cursor()
-
-c.execute("""CREATE TABLE IF NOT EXISTS expenses (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                item TEXT,
-                amount REAL,
-                date TEXT
-            )""")
-
-c.execute("""CREATE TABLE IF NOT EXISTS eid_money (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                giver TEXT,
-                amount REAL,
-                date TEXT
-            )""")
-
-c.execute("""CREATE TABLE IF NOT EXISTS rewards (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                type TEXT,
-                amount REAL,
-                date TEXT
-            )""")
-
-conn.commit()
-
-# ------------------ Constants ------------------
-POCKET_MONEY = 50  # fixed monthly pocket money
+import storage
+from expected import expected_balances
+from recurrence import get_rule
+from storage import DEFAULT_CATEGORY, DEFAULT_PERIOD, add_eid_money, add_reward, connection
 
 # ------------------ Helper Functions ------------------
 def add_expense(item, amount):
-    c.execute("INSERT INTO expenses (item, amount, date) VALUES (?, ?, ?)",
-              (item, amount, datetime.date.today().isoformat()))
-    conn.commit()
-
-def remove_expense(expense_id):
-    c.execute("DELETE FROM expenses WHERE id=?", (expense_id,))
-    conn.commit()
-
-def get_expenses():
-    c.execute("SELECT * FROM expenses")
-    return c.fetchall()
-
-def add_eid_money(giver, amount):
-    c.execute("INSERT INTO eid_money (giver, amount, date) VALUES (?, ?, ?)",
-              (giver, amount, datetime.date.today().isoformat()))
-    conn.commit()
-
-def get_eid_money():
-    c.execute("SELECT * FROM eid_money")
-    return c.fetchall()
-
-def add_reward(type_name, amount):
-    c.execute("INSERT INTO rewards (type, amount, date) VALUES (?, ?, ?)",
-              (type_name, amount, datetime.date.today().isoformat()))
-    conn.commit()
-
-def get_rewards():
-    c.execute("SELECT * FROM rewards")
-    return c.fetchall()
+    storage.add_expense(item, DEFAULT_CATEGORY, amount, DEFAULT_PERIOD)
 
 def calculate_expected(period="month"):
-    total = 0
-    if period == "month":
-        total += POCKET_MONEY
-    elif period == "year":
-        total += POCKET_MONEY * 12
-
-    # Rewards
-    rewards = get_rewards()
-    for r in rewards:
-        if r[1] == "weekly_10":
-            if period == "month":
-                total += 40  # 4 weeks per month
-            elif period == "year":
-                total += 520
-        elif r[1] == "monthly_50":
-            if period == "month":
-                total += 50
-            elif period == "year":
-                total += 600
-
-    # Eid money
-    eid_list = get_eid_money()
-    for e in eid_list:
-        total += e[2]
-
-    # Subtract expenses
-    expenses = get_expenses()
-    for exp in expenses:
-        total -= exp[2]
-
-    return total
+    with connection() as conn:
+        return expected_balances(conn, get_rule('pocket_money'), [period])[period]
 
 # ------------------ Streamlit UI ------------------
 st.set_page_config(page_title="Riyal Tracker", page_icon="💰", layout="centered")
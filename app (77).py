@@ -1,40 +1,14 @@
  
 import streamlit as st
-import sqlite3
-import datetime
-
-# ----------------- Database Setup -----------------
-conn = sqlite3.connect("riyals.db")
-c = conn.cursor()
-c.execute('''CREATE TABLE IF NOT EXISTS transactions
-             (id INTEGER PRIMARY KEY AUTOINCREMENT,
-              type TEXT,
-              amount REAL,
-              note TEXT,
-              date TEXT)''')
-conn.commit()
-
-# ----------------- Helper Functions -----------------
-def add_transaction(t_type, amount, note):
-    date = datetime.date.today().strftime("%Y-%m-%d")
-    c.execute("INSERT INTO transactions (type, amount, note, date) VALUES (?, ?, ?, ?)", 
-              (t_type, amount, note, date))
-    conn.commit()
-
-def get_total():
-    c.execute("SELECT SUM(amount) FROM transactions")
-    total = c.fetchone()[0]
-    return total if total else 0
-
-def get_transactions():
-    c.execute("SELECT * FROM transactions ORDER BY date DESC")
-    return c.fetchall()
+from forecast import forecast_transactions
+from storage import add_transaction, get_total, get_transactions
+from ui import export_panel, search_panel
 
 # ----------------- UI -----------------
 st.set_page_config(page_title="Riyal Tracker", page_icon="💰", layout="centered")
 st.title("💰 Riyal Tracker")
 
-menu = ["Add Expense", "Add Eid Money", "View Balance", "History"]
+menu = ["Add Expense", "Add Eid Money", "View Balance", "History", "Search"]
 choice = st.sidebar.selectbox("Menu", menu)
 
 if choice == "Add Expense":
@@ -58,16 +32,21 @@ elif choice == "View Balance":
     total = get_total()
     st.metric("Current Balance", f"{total:.2f} ﷼")
 
-    col1, col2 = st.columns(2)
-    with col1:
-        if st.button("Expected for Month"):
-            st.info(f"You should have about {total:.2f} ﷼ at the end of the month.")
-    with col2:
-        if st.button("Expected for Year"):
-            st.info(f"You should have about {total*12:.2f} ﷼ at the end of the year.")
+    forecasts = {f.horizon: f for f in forecast_transactions()}
+    col1, col2, col3 = st.columns(3)
+    for col, horizon, label in ((col1, "week", "Week"), (col2, "month", "Month"), (col3, "year", "Year")):
+        with col:
+            if st.button(f"Expected for {label}"):
+                f = forecasts[horizon]
+                st.info(f"You should have about {f.expected:.2f} ﷼ at the end of the {horizon} "
+                        f"({f.low:.2f} to {f.high:.2f} ﷼).")
 
 elif choice == "History":
     st.subheader("📜 Transaction History")
     rows = get_transactions()
     for r in rows:
-        st.write(f"{r[4]} | {r[1]} | {r[2]} ﷼ | {r[3]}")
+        st.write(f"{r.date} | {r.type} | {r.amount} ﷼ | {r.note}")
+    export_panel(tables=("transactions",))
+
+elif choice == "Search":
+    search_panel(sources=("transactions",))
@@ -1,42 +1,15 @@
 
 import streamlit as st
-import sqlite3
-import datetime
-
-# Database setup
-conn = sqlite3.connect("pocket_money.db")
-cursor = conn.cursor()
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS expenses (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    name TEXT,
-    amount REAL,
-    date TEXT
-)
-""")
-conn.commit()
-
-# Monthly budget (change it as you like)
-MONTHLY_BUDGET = 1000
+import storage
+from recurrence import get_rule, period_amount
+from storage import DEFAULT_CATEGORY, DEFAULT_PERIOD, get_total_spent, remove_expense
 
 # Functions
-def get_total_spent():
-    cursor.execute("SELECT SUM(amount) FROM expenses")
-    result = cursor.fetchone()[0]
-    return result if result else 0
-
 def add_expense(name, amount):
-    date = datetime.date.today().isoformat()
-    cursor.execute("INSERT INTO expenses (name, amount, date) VALUES (?, ?, ?)", (name, amount, date))
-    conn.commit()
-
-def remove_expense(expense_id):
-    cursor.execute("DELETE FROM expenses WHERE id=?", (expense_id,))
-    conn.commit()
+    storage.add_expense(name, DEFAULT_CATEGORY, amount, DEFAULT_PERIOD)
 
 def get_expenses():
-    cursor.execute("SELECT id, name, amount, date FROM expenses ORDER BY id DESC")
-    return cursor.fetchall()
+    return storage.get_all_expenses()
 
 # Web App UI
 st.title("💰 Riyal Tracker")
@@ -44,7 +17,7 @@ st.write("Track your pocket money and expenses easily.")
 
 # Balance
 spent = get_total_spent()
-balance = MONTHLY_BUDGET - spent
+balance = period_amount([get_rule('monthly_budget')], 'Month') - spent
 st.metric("Remaining Balance", f"{balance} ﷼", f"-{spent} ﷼ spent")
 
 # Add expense
@@ -63,12 +36,12 @@ expenses = get_expenses()
 for exp in expenses:
     col1, col2, col3, col4 = st.columns([2,2,2,1])
     with col1:
-        st.write(exp[1])
+        st.write(exp.name)
     with col2:
-        st.write(f"{exp[2]} ﷼")
+        st.write(f"{exp.amount} ﷼")
     with col3:
-        st.write(exp[3])
+        st.write(exp.date)
     with col4:
-        if st.button("❌", key=exp[0]):
-            remove_expense(exp[0])
+        if st.button("❌", key=exp.id):
+            remove_expense(exp.id)
             st.experimental_rerun()
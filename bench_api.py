@@ -0,0 +1,106 @@
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+
+import api
+import storage
+import tokens
+
+SCRIPT = 'riyaltacker_full 9999.py'
+
+
+def summary(latencies, seconds):
+    p99 = statistics.quantiles(latencies, n=100)[98] if len(latencies) > 1 else latencies[0]
+    return statistics.median(latencies), p99, len(latencies) / seconds
+
+
+def streamlit_add(requests):
+    """The UI path: an AppTest rerun that types an expense and clicks the add button.
+
+    AppTest runs the script in-process, so this is the server-side cost of a
+    rerun without the browser's websocket round trip.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.abspath(SCRIPT), default_timeout=600)
+    app.run()
+    latencies = []
+    begin = time.perf_counter()
+    for i in range(requests):
+        app.text_input[0].input(f'item {i}')
+        app.number_input[0].set_value(2.5)
+        start = time.perf_counter()
+        app.button[0].click().run()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return summary(latencies, time.perf_counter() - begin)
+
+
+async def api_add(client, requests, concurrency):
+    latencies = []
+
+    async def worker(count):
+        for i in range(count):
+            start = time.perf_counter()
+            response = await client.post('/expenses', json={'name': f'item {i}', 'amount': 2.5})
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    begin = time.perf_counter()
+    await asyncio.gather(*(worker(requests // concurrency) for _ in range(concurrency)))
+    return summary(latencies, time.perf_counter() - begin)
+
+
+def _headers():
+    return {'Authorization': f'Bearer {tokens.issue_token("bench")}'}
+
+
+async def in_process(requests, concurrency):
+    """ASGI calls without a socket: the cost of the handlers and the database."""
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url='http://api',
+                                 headers=_headers()) as client:
+        result = await api_add(client, requests, concurrency)
+    await api.databases.close()
+    return result
+
+
+async def loopback(server, requests, concurrency):
+    """HTTP over 127.0.0.1 to the uvicorn thread the Streamlit process would start."""
+    host, port = server.config.host, server.config.port
+    async with httpx.AsyncClient(base_url=f'http://{host}:{port}', headers=_headers()) as client:
+        return await api_add(client, requests, concurrency)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Adding expenses through the JSON API vs a Streamlit rerun')
+    parser.add_argument('--requests', type=int, default=2000, help='API requests per run')
+    parser.add_argument('--reruns', type=int, default=50, help='Streamlit reruns')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 16])
+    parser.add_argument('--port', type=int, default=api.PORT)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        storage.configure(os.path.join(directory, 'bench.db'))
+        rows = [('streamlit rerun', 1, *streamlit_add(args.reruns))]
+        for concurrency in args.concurrency:
+            rows.append(('api in-process', concurrency, *asyncio.run(in_process(args.requests, concurrency))))
+        # after the in-process runs: the open databases belong to one event loop, from here on uvicorn's
+        server = api.serve(port=args.port)
+        if server is None:
+            parser.error(f'port {args.port} is taken')
+        for concurrency in args.concurrency:
+            rows.append(('api http 127.0.0.1', concurrency, *asyncio.run(loopback(server, args.requests,
+                                                                                  concurrency))))
+        print(f'{"path":<24} {"clients":>7} {"p50 (ms)":>9} {"p99 (ms)":>9} {"req/s":>9}')
+        for path, clients, p50, p99, rate in rows:
+            print(f'{path:<24} {clients:>7} {p50:>9.2f} {p99:>9.2f} {rate:>9.0f}')
+        server.should_exit = True
+        storage.get_pool().close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+import argparse
+import os
+import tempfile
+import time
+
+import storage
+
+
+def rows_for(n):
+    return [(f'item {i}', 'Food', 1.0 + i % 50, 'Month') for i in range(n)]
+
+
+def one_commit_each(rows):
+    for row in rows:
+        storage.add_expense(*row)
+
+
+def one_transaction(rows):
+    with storage.transaction():
+        for row in rows:
+            storage.add_expense(*row)
+
+
+def bulk(rows):
+    storage.add_expenses_many(rows)
+
+
+STRATEGIES = [
+    ('add_expense, one commit each', one_commit_each),
+    ('add_expense inside transaction()', one_transaction),
+    ('add_expenses_many', bulk),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-row cost of expense writes: one commit each vs batched')
+    parser.add_argument('-n', type=int, nargs='+', default=[100, 1_000, 10_000])
+    args = parser.parse_args()
+
+    print(f'{"rows":>7} {"strategy":<34} {"total (ms)":>11} {"per row (µs)":>13}')
+    with tempfile.TemporaryDirectory() as directory:
+        for n in args.n:
+            rows = rows_for(n)
+            for label, write in STRATEGIES:
+                storage.configure(os.path.join(directory, f'{n}-{write.__name__}.db'))
+                storage.get_total_expenses('Month')  # open the pool and create the schema outside the timing
+                start = time.perf_counter()
+                write(rows)
+                elapsed = time.perf_counter() - start
+                assert storage.get_total_expenses('Month') == sum(row[2] for row in rows)
+                print(f'{n:>7} {label:<34} {elapsed * 1000:>11.1f} {elapsed / n * 1e6:>13.1f}')
+
+
+if __name__ == '__main__':
+    main()
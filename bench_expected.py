@@ -0,0 +1,87 @@
+import argparse
+import datetime
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from expected import expected_balances
+
+POCKET_MONEY = 50
+# February 2023 has four Mondays and 2023 has 52, the counts the legacy loop assumed for every month and year
+TODAY = datetime.date(2023, 2, 15)
+SCHEMA = [
+    'CREATE TABLE expenses (id INTEGER PRIMARY KEY AUTOINCREMENT, item TEXT, amount REAL, date TEXT)',
+    'CREATE TABLE eid_money (id INTEGER PRIMARY KEY AUTOINCREMENT, giver TEXT, amount REAL, date TEXT)',
+    'CREATE TABLE rewards (id INTEGER PRIMARY KEY AUTOINCREMENT, type TEXT, amount REAL, date TEXT)',
+]
+
+
+def build(path, rows, seed=0):
+    """riyaltacker.db layout with `rows` rows split 80/10/10 over expenses, eid_money and rewards."""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    for ddl in SCHEMA:
+        conn.execute(ddl)
+    conn.executemany('INSERT INTO expenses (item, amount, date) VALUES (?, ?, ?)',
+                     (('item', round(rng.uniform(1, 50), 2), '2024-01-01') for _ in range(rows * 8 // 10)))
+    conn.executemany('INSERT INTO eid_money (giver, amount, date) VALUES (?, ?, ?)',
+                     (('giver', round(rng.uniform(10, 200), 2), '2024-04-10') for _ in range(rows // 10)))
+    conn.executemany('INSERT INTO rewards (type, amount, date) VALUES (?, ?, ?)',
+                     ((rng.choice(['weekly_10', 'monthly_50']), 10, '2024-01-01') for _ in range(rows // 10)))
+    conn.commit()
+    return conn
+
+
+def legacy_expected(conn, period):
+    """The original calculate_expected() from app (13).py."""
+    c = conn.cursor()
+    total = 0
+    if period == 'month':
+        total += POCKET_MONEY
+    elif period == 'year':
+        total += POCKET_MONEY * 12
+    c.execute('SELECT * FROM rewards')
+    for r in c.fetchall():
+        if r[1] == 'weekly_10':
+            total += 40 if period == 'month' else 520 if period == 'year' else 0
+        elif r[1] == 'monthly_50':
+            total += 50 if period == 'month' else 600 if period == 'year' else 0
+    c.execute('SELECT * FROM eid_money')
+    for e in c.fetchall():
+        total += e[2]
+    c.execute('SELECT * FROM expenses')
+    for exp in c.fetchall():
+        total -= exp[2]
+    return total
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='calculate_expected: Python loops vs one aggregate query')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f'{"rows":>9} {"legacy month+year (ms)":>23} {"engine month+year (ms)":>23} {"speedup":>8}')
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in args.rows:
+            conn = build(os.path.join(directory, f'{rows}.db'), rows)
+            legacy, old = best_of(lambda: {p: legacy_expected(conn, p) for p in ('month', 'year')}, args.repeat)
+            engine, new = best_of(lambda: expected_balances(conn, POCKET_MONEY, ('month', 'year'), TODAY), args.repeat)
+            assert all(abs(old[p] - new[p]) < 1e-6 for p in old), (old, new)
+            print(f'{rows:>9} {legacy * 1000:>23.1f} {engine * 1000:>23.1f} {legacy / engine:>7.1f}x')
+            conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+import argparse
+import os
+import random
+import resource
+import tempfile
+import time
+
+import storage
+from importer import import_csv
+
+CATEGORIES = ['Food', 'Online Shopping', 'Stores', 'Toys', 'Other']
+
+
+def write_statement(path, rows, seed=0):
+    rng = random.Random(seed)
+    with open(path, 'w', newline='') as f:
+        f.write('Date,Description,Category,Amount\n')
+        for i in range(rows):
+            f.write(f'{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2024,shop {i % 997},'
+                    f'{CATEGORIES[i % 5]},-{rng.uniform(1, 300):.2f}\n')
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CSV import throughput vs one add_expense() per row')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--per-row', type=int, default=5_000, help='rows for the add_expense() baseline')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, 'statement.csv')
+        write_statement(csv_path, args.rows)
+        size_mb = os.path.getsize(csv_path) / 1e6
+
+        storage.configure(os.path.join(directory, 'per_row.db'))
+        start = time.perf_counter()
+        for i in range(args.per_row):
+            storage.add_expense(f'shop {i}', 'Food', 1.0, 'Month')
+        per_row = time.perf_counter() - start
+
+        storage.configure(os.path.join(directory, 'bulk.db'))
+        rss_before = peak_rss_mb()
+        start = time.perf_counter()
+        with open(csv_path, 'rb') as f:
+            stats = import_csv(f, 'Month')
+        bulk = time.perf_counter() - start
+        assert storage.check_aggregates() == []
+
+        print(f'statement: {args.rows} rows, {size_mb:.0f} MB')
+        print(f'add_expense() per row: {args.per_row / per_row:>10.0f} rows/s')
+        print(f'import_csv():          {stats["imported"] / bulk:>10.0f} rows/s  ({bulk:.1f}s total)')
+        print(f'peak RSS before/after import: {rss_before:.0f} / {peak_rss_mb():.0f} MB')
+
+
+if __name__ == '__main__':
+    main()
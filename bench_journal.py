@@ -0,0 +1,63 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from journal import Journal
+
+CATEGORIES = ['food', 'toys', 'games', 'snacks', 'books']
+
+
+def legacy_spends(path, n):
+    """The old save path: every spend rewrites the whole file with indent=4."""
+    data = {'income': [], 'expenses': []}
+    for i in range(n):
+        data['expenses'].append({'amount': float(i % 50), 'category': CATEGORIES[i % 5]})
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=4)
+    return data
+
+
+def journal_spends(path, n):
+    journal = Journal(path)
+    data = journal.load()
+    for i in range(n):
+        amount, category = float(i % 50), CATEGORIES[i % 5]
+        data.spend(amount, category)
+        journal.record(data, {'op': 'spend', 'amount': amount, 'category': category})
+    journal.close()
+    return data
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sequential spend commands: full rewrite vs journal')
+    parser.add_argument('-n', type=int, default=100_000)
+    parser.add_argument('--legacy-limit', type=int, default=5_000,
+                        help='cap for the full-rewrite run, which is quadratic in n')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        legacy_n = min(args.n, args.legacy_limit)
+        legacy, _ = timed(legacy_spends, os.path.join(directory, 'legacy.json'), legacy_n)
+        path = os.path.join(directory, 'journal.json')
+        after, written = timed(journal_spends, path, args.n)
+        reload, loaded = timed(Journal(path).load)
+        assert loaded.to_dict() == written.to_dict()
+
+        print(f'{"mode":<14} {"spends":>8} {"total (s)":>10} {"per spend (us)":>15}')
+        print(f'{"full rewrite":<14} {legacy_n:>8} {legacy:>10.2f} {legacy / legacy_n * 1e6:>15.1f}')
+        print(f'{"journal":<14} {args.n:>8} {after:>10.2f} {after / args.n * 1e6:>15.1f}')
+        print(f'load (snapshot + journal tail) of {args.n} entries: {reload * 1000:.0f} ms')
+        if legacy_n < args.n:
+            print(f'full rewrite stopped at {legacy_n}; its per-spend cost keeps growing linearly with n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+
+import storage
+from datagen import generate
+
+SCRIPT = 'riyaltacker_full 9999.py'
+LARGE_ROWS = 20_000  # the original script renders every row of a period, so keep this modest
+
+
+def root_revision():
+    return subprocess.run(['git', 'rev-list', '--max-parents=0', 'HEAD'], capture_output=True, text=True,
+                          check=True).stdout.split()[0]
+
+
+def rerun_ms(path, repeat):
+    """Median wall time of AppTest reruns of the script at ``path``, after one warm-up run."""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(path, default_timeout=600)
+    app.run()
+    if app.exception:
+        raise RuntimeError(f'{path} failed: {app.exception[0].message}')
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        app.run()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def before(script, revision, db, directory, repeat):
+    """The script as it was at ``revision``: it opens pocket_money.db in the working directory."""
+    source = subprocess.run(['git', 'show', f'{revision}:{script}'], capture_output=True, check=True).stdout
+    workdir = tempfile.mkdtemp(dir=directory)
+    path = os.path.join(workdir, 'before.py')
+    with open(path, 'wb') as f:
+        f.write(source)
+    if db is not None:
+        shutil.copy(db, os.path.join(workdir, 'pocket_money.db'))
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        return rerun_ms(path, repeat)
+    finally:
+        os.chdir(cwd)
+
+
+def after(script, db, directory, repeat):
+    path = os.path.join(directory, f'after-{len(os.listdir(directory))}.db')
+    if db is not None:
+        shutil.copy(db, path)
+    storage.configure(path)
+    return rerun_ms(os.path.abspath(script), repeat)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rerun latency of an app script before and after this work')
+    parser.add_argument('--script', default=SCRIPT)
+    parser.add_argument('--before-rev', help='revision of the "before" script, from before it used storage.py '
+                                             '(default: the first commit)')
+    parser.add_argument('--rows', type=int, default=LARGE_ROWS, help='rows in the large database')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    revision = args.before_rev or root_revision()
+    print(f'{args.script}: {revision[:10]} vs working tree, median of {args.repeat} reruns')
+    print(f'{"database":>16} {"before (ms)":>12} {"after (ms)":>11} {"speedup":>8}')
+    with tempfile.TemporaryDirectory() as directory:
+        large = os.path.join(directory, 'large.db')
+        generate(large, args.rows)
+        storage.get_pool().close()
+        for label, db in (('empty', None), (f'{args.rows} rows', large)):
+            old = before(args.script, revision, db, directory, args.repeat)
+            new = after(args.script, db, directory, args.repeat)
+            print(f'{label:>16} {old:>12.1f} {new:>11.1f} {old / new:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Peak memory of listing every expense as tuples, as row objects, and streamed.
+
+    python bench_rows.py --size 1m
+    python bench_rows.py --db pocket_money.db
+
+Each way runs in a fresh interpreter so the peaks don't mask each other;
+the figure is the peak RSS above the RSS right before the listing.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import storage
+
+
+def _tuples():
+    # what the readers returned before the row classes
+    with storage.connection() as conn:
+        return conn.execute(storage.ALL_EXPENSES_SQL).fetchall()
+
+
+WAYS = {
+    'tuples (fetchall)': _tuples,
+    'Expense list': storage.get_all_expenses,
+    'Expense stream': lambda: sum(1 for _ in storage.iter_all_expenses()),
+}
+
+
+def rss_kb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+
+
+def measure(way):
+    """Run one way in this process; returns (rows, seconds, peak KB above the starting RSS)."""
+    storage.get_total_spent()  # open the connection first: only the listing is measured
+    before = rss_kb()
+    start = time.perf_counter()
+    result = WAYS[way]()
+    elapsed = time.perf_counter() - start
+    rows = result if isinstance(result, int) else len(result)
+    return rows, elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', default='1m', help='seeded database size, see bench_suite.py')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', default='.bench-data')
+    parser.add_argument('--db', help='use this database instead of a seeded one')
+    parser.add_argument('--way', choices=WAYS, help=argparse.SUPPRESS)  # run one way (in a child)
+    args = parser.parse_args()
+
+    if args.way:
+        storage.configure(args.db)
+        print(json.dumps(measure(args.way)))
+        return
+
+    if args.db is None:
+        from bench_suite import database
+
+        os.makedirs(args.data_dir, exist_ok=True)
+        args.db = database(args.data_dir, args.size, args.seed)
+    print(f'{"":<20} {"rows":>9} {"seconds":>8} {"peak MB":>8} {"bytes/row":>10}')
+    for way in WAYS:
+        child = subprocess.run([sys.executable, __file__, '--db', args.db, '--way', way],
+                               check=True, capture_output=True, text=True)
+        rows, elapsed, peak_kb = json.loads(child.stdout)
+        print(f'{way:<20} {rows:>9} {elapsed:>8.2f} {peak_kb / 1024:>8.1f} {peak_kb * 1024 / max(rows, 1):>10.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+import storage
+
+# One simulated "rerun" of the Main page: record an expense, then read back
+# everything the page shows (total for the period, Eid total, expense list).
+PERIODS = ['Week', 'Month', 'Year']
+
+
+def legacy_backend(path):
+    """The old layout: one module-level connection and cursor shared by every session."""
+    conn = sqlite3.connect(path, check_same_thread=False)
+    cursor = conn.cursor()
+    for ddl in storage.SCHEMA:
+        cursor.execute(ddl)
+    conn.commit()
+    lock = threading.Lock()  # without it the shared cursor returns interleaved rows
+
+    def rerun(i):
+        period = PERIODS[i % 3]
+        with lock:
+            cursor.execute('INSERT INTO expenses (name, category, amount, period, date) VALUES (?, ?, ?, ?, ?)',
+                           ('item', 'Food', 1.5, period, '2024-01-01'))
+            conn.commit()
+        with lock:
+            cursor.execute('SELECT SUM(amount) FROM expenses WHERE period=?', (period,))
+            cursor.fetchone()
+        with lock:
+            cursor.execute('SELECT SUM(amount), GROUP_CONCAT(giver, ", ") FROM eid_money')
+            cursor.fetchone()
+        with lock:
+            cursor.execute('SELECT id, name, category, amount, date FROM expenses WHERE period=? ORDER BY id DESC LIMIT 50',
+                           (period,))
+            cursor.fetchall()
+
+    return rerun, conn.close
+
+
+def pooled_backend(path):
+    pool = storage.configure(path)
+
+    def rerun(i):
+        period = PERIODS[i % 3]
+        storage.add_expense('item', 'Food', 1.5, period)
+        storage.get_total_expenses(period)
+        storage.get_total_eid()
+        with pool.connection() as conn:
+            conn.execute('SELECT id, name, category, amount, date FROM expenses WHERE period=? ORDER BY id DESC LIMIT 50',
+                         (period,)).fetchall()
+
+    return rerun, pool.close
+
+
+BACKENDS = {'legacy': legacy_backend, 'pooled': pooled_backend}
+
+
+def run(backend, sessions, seconds, directory):
+    path = os.path.join(directory, f'{backend}-{sessions}.db')
+    rerun, close = BACKENDS[backend](path)
+    counts = [0] * sessions
+    errors = [0] * sessions
+    stop = threading.Event()
+
+    def session(n):
+        i = 0
+        while not stop.is_set():
+            try:
+                rerun(i)
+                counts[n] += 1
+            except sqlite3.OperationalError:
+                errors[n] += 1
+            i += 1
+
+    threads = [threading.Thread(target=session, args=(n,)) for n in range(sessions)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    close()
+    return sum(counts) / elapsed, sum(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent session throughput of the storage layer')
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--backend', choices=list(BACKENDS), nargs='+', default=list(BACKENDS))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f'{"backend":<8} {"sessions":>8} {"reruns/s":>10} {"errors":>7}')
+        for backend in args.backend:
+            for sessions in args.sessions:
+                throughput, errors = run(backend, sessions, args.seconds, directory)
+                print(f'{backend:<8} {sessions:>8} {throughput:>10.0f} {errors:>7}')
+
+
+if __name__ == '__main__':
+    main()
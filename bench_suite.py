@@ -0,0 +1,159 @@
+"""Benchmark suite: times the data functions and a full app rerun on seeded databases.
+
+    python bench_suite.py --sizes 1k 100k --out results.json
+    python bench_suite.py --baseline results.json    # exits 1 on a regression
+
+Databases are generated once per (size, seed) into --data-dir and reused.
+Results are milliseconds keyed by size and benchmark; regressions compare the
+fastest run, which is the one least disturbed by other load.
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import time
+
+import analytics
+import forecast
+import search
+import storage
+from datagen import GENERATOR_VERSION, SIZES, generate
+from expected import expected_balances
+from recurrence import get_rule
+
+APP_SCRIPT = 'riyaltacker_full 9999.py'
+APP_RERUNS = 20
+THRESHOLD = 0.20     # slower than baseline by more than this fraction...
+NOISE_FLOOR_MS = 2.0  # ...and by more than this many milliseconds is a regression
+
+
+def _calculate_expected():
+    # what calculate_expected() in app (13).py runs
+    with storage.connection() as conn:
+        return expected_balances(conn, get_rule('pocket_money'), ['month'])['month']
+
+
+BENCHMARKS = {
+    'get_expenses': lambda: storage.get_expenses('Month'),
+    'get_total_expenses': lambda: storage.get_total_expenses('Month'),
+    'get_total_eid': storage.get_total_eid,
+    'get_top_givers': storage.get_top_givers,
+    'get_eid_by_year': storage.get_eid_by_year,
+    'calculate_expected': _calculate_expected,
+    'get_transactions': storage.get_transactions,
+    'get_monthly_rollup': storage.get_monthly_rollup,
+    'get_yearly_rollup': storage.get_yearly_rollup,
+    'analytics by_period': lambda: analytics.by_period('week'),  # cold: includes the columnar fetch
+    'forecast_transactions': forecast.forecast_transactions,
+    'search expenses': lambda: search.search('expenses', 'food'),
+}
+
+
+def timed(fn, repeat, before=None):
+    times = []
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return {'median_ms': statistics.median(times), 'min_ms': min(times), 'runs': repeat}
+
+
+def database(data_dir, size, seed):
+    path = os.path.join(data_dir, f'bench-{size}-seed{seed}-v{GENERATOR_VERSION}.db')
+    if not os.path.exists(path):
+        print(f'generating {path} ...', file=sys.stderr)
+        generate(path + '.tmp', SIZES[size], seed)
+        storage.get_pool().close()
+        for suffix in ('-wal', '-shm'):
+            if os.path.exists(path + '.tmp' + suffix):
+                os.remove(path + '.tmp' + suffix)
+        os.replace(path + '.tmp', path)
+    return path
+
+
+def app_rerun(script, repeat):
+    """Wall time of AppTest reruns of ``script`` after one warm-up run.
+
+    A rerun is noisier than a single query, so it gets at least APP_RERUNS runs.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(script, default_timeout=600)
+    app.run()
+    if app.exception:
+        raise RuntimeError(f'{script} failed: {app.exception[0].message}')
+    return timed(app.run, max(repeat, APP_RERUNS))
+
+
+def run_suite(sizes, seed, repeat, data_dir, script):
+    results = {}
+    for size in sizes:
+        storage.configure(database(data_dir, size, seed))
+        size_results = results[size] = {}
+        for name, fn in BENCHMARKS.items():
+            # cold: every run recomputes; warm: served from the per-version read cache
+            size_results[name] = timed(fn, repeat, before=storage.read_cache.clear)
+            size_results[name + ' (cached)'] = timed(fn, repeat)
+        if script:
+            size_results['app rerun'] = app_rerun(script, repeat)
+        for name, result in size_results.items():
+            print(f'{size:>5} {name:<30} {result["median_ms"]:>10.2f} ms', file=sys.stderr)
+    return results
+
+
+def regressions(results, baseline, threshold=THRESHOLD, noise_floor_ms=NOISE_FLOOR_MS):
+    """(size, benchmark, baseline_ms, now_ms) for every benchmark whose fastest run got slower than allowed."""
+    found = []
+    for size, benchmarks in results.items():
+        for name, result in benchmarks.items():
+            before = baseline.get(size, {}).get(name)
+            if before is None:
+                continue
+            was, now = before['min_ms'], result['min_ms']
+            if now > was * (1 + threshold) and now - was > noise_floor_ms:
+                found.append((size, name, was, now))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', choices=SIZES, default=['1k', '100k'])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--data-dir', default='.bench-data')
+    parser.add_argument('--script', default=APP_SCRIPT, help="app script to rerun through AppTest ('' to skip)")
+    parser.add_argument('--out', help='write results JSON here')
+    parser.add_argument('--baseline', help='results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD)
+    args = parser.parse_args()
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    results = run_suite(args.sizes, args.seed, args.repeat, args.data_dir, args.script)
+    report = {
+        'meta': {'seed': args.seed, 'repeat': args.repeat, 'python': platform.python_version(),
+                 'sqlite': sqlite3.sqlite_version, 'platform': platform.platform(),
+                 'time': time.strftime('%Y-%m-%dT%H:%M:%S')},
+        'results': results,
+    }
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=4)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        found = regressions(results, baseline, args.threshold)
+        for size, name, was, now in found:
+            print(f'REGRESSION {size} {name}: {was:.2f} ms -> {now:.2f} ms ({now / was - 1:+.0%})')
+        if found:
+            sys.exit(1)
+        print(f'no regressions against {args.baseline}')
+
+
+if __name__ == '__main__':
+    main()
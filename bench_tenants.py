@@ -0,0 +1,80 @@
+import argparse
+import gc
+import os
+import random
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import storage
+
+PERIODS = ('Week', 'Month', 'Year')
+
+
+def rss_mb():
+    """Current resident set size (not the peak), so a drop after eviction shows up."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def open_files():
+    try:
+        return len(os.listdir('/proc/self/fd'))
+    except OSError:
+        return -1
+
+
+def seed(tenant, rows):
+    with storage.use_tenant(tenant):
+        storage.add_expenses_many((f'item {i}', 'Food', 1.0 + i % 20, PERIODS[i % 3]) for i in range(rows))
+
+
+def request(tenant, rng):
+    """One rerun's worth of work for a household: a write and the reads the main page does."""
+    start = time.perf_counter()
+    with storage.use_tenant(tenant):
+        period = rng.choice(PERIODS)
+        storage.add_expense('snack', 'Food', 2.5, period)
+        storage.get_total_expenses(period)
+        storage.get_total_eid()
+        storage.get_expenses_page(period)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Latency and memory as the number of households grows')
+    parser.add_argument('--tenants', type=int, nargs='+', default=[10, 100, 500, 1000])
+    parser.add_argument('--requests', type=int, default=5000, help='requests per step')
+    parser.add_argument('--rows', type=int, default=200, help='expenses seeded per household')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--max-open', type=int, default=storage.MAX_OPEN_TENANTS)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f'{"households":>10} {"p50 (ms)":>9} {"p99 (ms)":>9} {"RSS (MB)":>9} {"open":>5} {"conns":>6} '
+          f'{"fds":>5} {"evicted":>8}')
+    with tempfile.TemporaryDirectory() as directory:
+        storage.configure_tenants(directory, max_open=args.max_open)
+        seeded = 0
+        for count in args.tenants:
+            for tenant in range(seeded, count):
+                seed(f'h{tenant}', args.rows)
+            seeded = max(seeded, count)
+            names = [f'h{rng.randrange(count)}' for _ in range(args.requests)]
+            with ThreadPoolExecutor(args.workers) as executor:
+                latencies = list(executor.map(lambda name: request(name, random.Random(name)), names))
+            gc.collect()
+            stats = storage.tenants.stats()
+            p99 = statistics.quantiles(latencies, n=100)[98]
+            print(f'{count:>10} {statistics.median(latencies):>9.2f} {p99:>9.2f} {rss_mb():>9.1f} '
+                  f'{stats["open"]:>5} {stats["connections"]:>6} {open_files():>5} {stats["evicted"]:>8}')
+        storage.tenants.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+import threading
+
+MAX_ENTRIES = 512
+
+
+class VersionedCache:
+    """Memoized reads that are only valid for the data version they were computed at.
+
+    Each entry remembers the version it was read under; a lookup under any
+    other version is a miss. Writers bump the version after they commit, so a
+    read never outlives the write that changed its answer.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, version_of, compute):
+        version = version_of()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        value = compute()
+        with self._lock:
+            # a write that landed while we were reading makes this value stale already
+            if version_of() == version:
+                if len(self._entries) >= self.max_entries:
+                    self._entries = {k: v for k, v in self._entries.items() if v[0] == version}
+                    if len(self._entries) >= self.max_entries:
+                        self._entries.clear()
+                self._entries[key] = (version, value)
+        return value
+
+    def discard(self, match):
+        """Drop the entries whose key ``match(key)`` is true."""
+        with self._lock:
+            self._entries = {k: v for k, v in self._entries.items() if not match(k)}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries),
+                    'hit_rate': self.hits / total if total else 0.0}
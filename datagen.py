@@ -0,0 +1,134 @@
+import datetime
+import random
+import sqlite3
+
+import storage
+from options import CATEGORIES, FONTS, PERIODS, TRASH_OPTIONS
+from storage import add_eid_money_many, add_rewards_many, add_transactions_many, insert_expenses, transaction
+
+GENERATOR_VERSION = 3  # bump whenever the same seed would produce different data
+SIZES = {'1k': 1_000, '100k': 100_000, '1m': 1_000_000}
+END_DATE = datetime.date(2024, 12, 31)  # fixed so the same seed gives the same database
+HISTORY_DAYS = 5 * 365
+CHUNK_SIZE = 50_000
+
+# Rows per table as a share of the requested size.
+SHARES = {'expenses': 1.0, 'transactions': 1.0, 'eid_money': 0.1, 'rewards': 0.1, 'settings': 0.01}
+
+GIVERS = ['أبي', 'أمي', 'جدي', 'جدتي', 'خالي', 'عمي', 'خالتي', 'عمتي', 'Uncle Sam', 'Grandma']
+REWARDS = [('weekly_10', 10), ('monthly_50', 50)]
+NOTES = ['lunch', 'game', 'gift', 'book', 'snacks', 'toy', 'pocket money', 'شاورما', 'هدية', '']
+# Columns of the append-only settings table the old app variants wrote one row to per save.
+LEGACY_SETTINGS = '''
+    CREATE TABLE IF NOT EXISTS settings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        pocket_money REAL,
+        trash_week REAL,
+        trash_month REAL,
+        trash_type TEXT,
+        font TEXT,
+        font_size INTEGER,
+        bg_color TEXT,
+        text_color TEXT
+    )'''
+
+
+def _dates(rng):
+    ordinal = END_DATE.toordinal()
+    while True:
+        yield datetime.date.fromordinal(ordinal - rng.randrange(HISTORY_DAYS)).isoformat()
+
+
+def _chunks(rows, size=CHUNK_SIZE):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def expense_rows(n, rng):
+    dates = _dates(rng)
+    for i in range(n):
+        yield (f'{rng.choice(NOTES) or "item"} {i}', rng.choice(CATEGORIES), round(rng.uniform(1, 150), 2),
+               rng.choices(PERIODS, (2, 6, 1))[0], next(dates))
+
+
+def eid_rows(n, rng):
+    dates = _dates(rng)
+    for _ in range(n):
+        yield rng.choice(GIVERS), float(rng.choice((50, 100, 200, 500))), next(dates)
+
+
+def reward_rows(n, rng):
+    dates = _dates(rng)
+    for _ in range(n):
+        reward, amount = rng.choice(REWARDS)
+        yield reward, amount, next(dates)
+
+
+def transaction_rows(n, rng):
+    dates = _dates(rng)
+    for _ in range(n):
+        if rng.random() < 0.25:
+            yield 'Income', round(rng.uniform(20, 500), 2), rng.choice(NOTES), next(dates)
+        else:
+            yield 'Expense', -round(rng.uniform(1, 150), 2), rng.choice(NOTES), next(dates)
+
+
+def settings_rows(n, rng):
+    for _ in range(n):
+        yield (rng.choice((50.0, 100.0, 1000.0)), rng.choice((0.0, 10.0)), rng.choice((0.0, 50.0)),
+               rng.choice(TRASH_OPTIONS), rng.choice(FONTS), rng.randrange(20, 60),
+               '#FFFFFF', '#000000')
+
+
+def generate(path, rows, seed=0):
+    """Fill the database at ``path`` with ``rows`` rows of seeded history; returns rows per table.
+
+    The same (rows, seed) always produces the same data. The legacy settings
+    table is written first so opening the database runs its migration; the rest
+    goes through the storage batch API so the aggregates match the app's.
+    """
+    rng = random.Random(seed)
+    counts = {table: max(1, int(rows * share)) for table, share in SHARES.items()}
+    with sqlite3.connect(path) as legacy:
+        legacy.execute(LEGACY_SETTINGS)
+        legacy.executemany('INSERT INTO settings (pocket_money, trash_week, trash_month, trash_type, font, '
+                           'font_size, bg_color, text_color) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                           settings_rows(counts['settings'], rng))
+    legacy.close()
+    storage.configure(path)
+    for chunk in _chunks(expense_rows(counts['expenses'], rng)):
+        with transaction() as conn:
+            insert_expenses(conn, chunk)
+    for chunk in _chunks(transaction_rows(counts['transactions'], rng)):
+        add_transactions_many(chunk)
+    for chunk in _chunks(eid_rows(counts['eid_money'], rng)):
+        add_eid_money_many(chunk)
+    for chunk in _chunks(reward_rows(counts['rewards'], rng)):
+        add_rewards_many(chunk)
+    return counts
+
+
+if __name__ == '__main__':
+    import argparse
+    import os
+    import time
+
+    parser = argparse.ArgumentParser(description='Generate a seeded database with years of history')
+    parser.add_argument('size', choices=SIZES, help='rows in expenses and transactions (others scale down)')
+    parser.add_argument('--db', help='output file (default: bench-<size>.db)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    path = args.db or f'bench-{args.size}.db'
+    if os.path.exists(path):
+        parser.error(f'{path} already exists')
+    start = time.perf_counter()
+    counts = generate(path, SIZES[args.size], args.seed)
+    print(f'{path}: ' + ', '.join(f'{table}={n}' for table, n in counts.items())
+          + f' in {time.perf_counter() - start:.1f}s')
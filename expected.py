@@ -0,0 +1,49 @@
+from recurrence import Rule, period_amount
+
+# What one saved reward of each type pays; how often that falls in a period is counted by recurrence.
+REWARD_RULES = {
+    'weekly_10': Rule('weekly_10', 10, 'weekly'),
+    'monthly_50': Rule('monthly_50', 50, 'monthly'),
+}
+
+# Everything the expected balance depends on, in a single statement: one row
+# per reward type with its count, then the Eid and expense sums.
+TOTALS_SQL = '''
+SELECT 'reward', type, COUNT(*) FROM rewards GROUP BY type
+UNION ALL
+SELECT 'eid', NULL, COALESCE(SUM(amount), 0) FROM eid_money
+UNION ALL
+SELECT 'expenses', NULL, COALESCE(SUM(amount), 0) FROM expenses
+'''
+
+
+def fetch_totals(conn):
+    reward_counts = {}
+    eid = expenses = 0
+    for kind, reward_type, value in conn.execute(TOTALS_SQL):
+        if kind == 'reward':
+            reward_counts[reward_type] = value
+        elif kind == 'eid':
+            eid = value
+        else:
+            expenses = value
+    return reward_counts, eid, expenses
+
+
+def expected_balances(conn, pocket_money, periods=('month', 'year'), today=None):
+    """Expected balance for each period in ``periods``, computed from one aggregate query.
+
+    ``pocket_money`` is a recurrence Rule, or a monthly amount. Pocket money
+    and rewards count for each time they pay in the calendar week, month or
+    year containing ``today``. Returns a dict mapping period -> balance.
+    """
+    if not isinstance(pocket_money, Rule):
+        pocket_money = Rule('pocket_money', pocket_money, 'monthly')
+    reward_counts, eid, expenses = fetch_totals(conn)
+    balances = {}
+    for period in periods:
+        total = period_amount([pocket_money], period, today)
+        for reward_type, count in reward_counts.items():
+            total += count * period_amount([REWARD_RULES.get(reward_type)], period, today)
+        balances[period] = total + eid - expenses
+    return balances
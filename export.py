@@ -0,0 +1,117 @@
+"""Export a table to CSV or Parquet a chunk at a time.
+
+Rows are read with ``fetchmany`` and written as they arrive, so memory is
+bounded by the chunk size whatever the size of the table. Every export
+reads from one snapshot: rows written while it runs are not in it. CSV
+headers are the ones import_csv() recognizes, so an expenses export can be
+imported again.
+"""
+import codecs
+import csv
+import io
+import sys
+
+from storage import connection
+
+CHUNK_SIZE = 10_000
+
+# Columns of each exported table and their Parquet types.
+TABLES = {
+    'expenses': (('id', 'int'), ('name', 'text'), ('category', 'text'), ('amount', 'real'), ('period', 'text'),
+                 ('date', 'text')),
+    'eid_money': (('id', 'int'), ('giver', 'text'), ('amount', 'real'), ('date', 'text')),
+    'rewards': (('id', 'int'), ('type', 'text'), ('amount', 'real'), ('date', 'text')),
+    'transactions': (('id', 'int'), ('type', 'text'), ('amount', 'real'), ('note', 'text'), ('date', 'text')),
+}
+FORMATS = ('csv', 'parquet')
+MIME_TYPES = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet'}
+
+
+def chunks(table, chunk_size=CHUNK_SIZE):
+    """Yield the rows of ``table`` in id order, ``chunk_size`` at a time."""
+    columns = ', '.join(name for name, _ in TABLES[table])
+    with connection() as conn:
+        cursor = conn.execute(f'SELECT {columns} FROM {table} ORDER BY id')
+        try:
+            while rows := cursor.fetchmany(chunk_size):
+                yield rows
+        finally:
+            cursor.close()  # ends the read snapshot even if the caller stops early
+
+
+def write_csv(table, stream, chunk_size=CHUNK_SIZE, progress=None):
+    """Write ``table`` as CSV to the binary ``stream``; returns the row count."""
+    stream.write(codecs.BOM_UTF8)  # lets Excel read Arabic; import_csv() skips it
+    text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+    try:
+        writer = csv.writer(text)
+        writer.writerow([name for name, _ in TABLES[table]])
+        count = 0
+        for rows in chunks(table, chunk_size):
+            writer.writerows(rows)
+            count += len(rows)
+            if progress is not None:
+                progress(count)
+        text.flush()
+    finally:
+        text.detach()  # leave the caller's stream open
+    return count
+
+
+def write_parquet(table, stream, chunk_size=CHUNK_SIZE, progress=None):
+    """Write ``table`` as Parquet to the binary ``stream``, a row group per chunk; returns the row count."""
+    import pyarrow as pa  # only needed for Parquet
+    import pyarrow.parquet as pq
+
+    types = {'int': pa.int64(), 'text': pa.string(), 'real': pa.float64()}
+    schema = pa.schema([(name, types[kind]) for name, kind in TABLES[table]])
+    count = 0
+    with pq.ParquetWriter(stream, schema) as writer:
+        for rows in chunks(table, chunk_size):
+            columns = zip(*rows)
+            writer.write_batch(pa.record_batch([pa.array(column, type=field.type)
+                                                for column, field in zip(columns, schema)], schema=schema))
+            count += len(rows)
+            if progress is not None:
+                progress(count)
+    return count
+
+
+def export(table, fmt, stream, chunk_size=CHUNK_SIZE, progress=None):
+    """Write ``table`` to the binary ``stream`` as 'csv' or 'parquet'; returns the row count."""
+    if table not in TABLES:
+        raise ValueError(f'unknown table {table!r}, expected one of {tuple(TABLES)}')
+    if fmt not in FORMATS:
+        raise ValueError(f'unknown format {fmt!r}, expected one of {FORMATS}')
+    writer = write_csv if fmt == 'csv' else write_parquet
+    return writer(table, stream, chunk_size, progress)
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    import storage
+
+    parser = argparse.ArgumentParser(description='Export a table to CSV or Parquet')
+    parser.add_argument('table', choices=TABLES)
+    parser.add_argument('--format', choices=FORMATS, default='csv')
+    parser.add_argument('-o', '--output', help="output file (default: <table>.<format>, '-' for stdout)")
+    parser.add_argument('--db', default=storage.DB_PATH)
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    storage.configure(args.db)
+    output = args.output or f'{args.table}.{args.format}'
+    start = time.perf_counter()
+
+    def report(rows):
+        print(f'\r{rows:>10} rows', end='', file=sys.stderr, flush=True)
+
+    if output == '-':
+        count = export(args.table, args.format, sys.stdout.buffer, args.chunk_size)
+    else:
+        with open(output, 'wb') as f:
+            count = export(args.table, args.format, f, args.chunk_size, report)
+        print(file=sys.stderr)
+    print(f'exported {count} rows to {output} in {time.perf_counter() - start:.1f}s', file=sys.stderr)
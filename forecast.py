@@ -0,0 +1,138 @@
+"""Projected balance at the end of this week, month and year.
+
+Spending is projected at the mean daily spending of the last SPEND_WINDOW
+days, with a band of BAND_Z standard deviations widening with the square
+root of the days left. Income is what the caller's recurrence rules pay
+in the days left (for the transactions table: the stored pocket money
+rule and the chore reward the settings pick), plus the mean daily income
+of the last INCOME_WINDOW days for income recorded without a rule; Eid
+money is a lump sum that doesn't recur, so it counts towards the balance
+but not towards that rate. History is
+two arrays, day numbers and signed amounts, turned into daily totals
+with one bincount, so years of it cost well under a millisecond; the
+database and ledger forecasts are cached until the next write.
+"""
+import datetime
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from cache import VersionedCache
+from options import TRASH_RULES
+from recurrence import amount_between, get_rules
+from settings import get_settings
+from storage import cached_read, connection, get_total
+
+SPEND_WINDOW = 28
+INCOME_WINDOW = 91
+BAND_Z = 1.28  # the band covers ~80% of outcomes if daily spending were normal
+HORIZONS = ('week', 'month', 'year')
+NO_DAY = np.iinfo(np.int64).min
+EPOCH = datetime.date(1970, 1, 1)
+INCOME_RULES = ('pocket_money',)  # stored rules paying into the balance, besides the chosen trash reward
+
+Forecast = namedtuple('Forecast', 'horizon end days expected low high')
+
+# Day number since the epoch and signed amount (expenses are negative) of every transaction but Eid money.
+TRANSACTIONS_SQL = (f'SELECT ifnull(CAST(julianday(date) - 2440587.5 AS INTEGER), {NO_DAY}), ifnull(amount, 0) '
+                    "FROM transactions WHERE type IS NOT 'eid'")
+
+
+def horizon_end(today, horizon):
+    """Last day of the week (Sunday), month or year that ``today`` is in."""
+    if horizon == 'week':
+        return today + datetime.timedelta(days=6 - today.weekday())
+    if horizon == 'month':
+        following = (today.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+        return following - datetime.timedelta(days=1)
+    if horizon == 'year':
+        return today.replace(month=12, day=31)
+    raise ValueError(f'unknown horizon {horizon!r}, expected one of {HORIZONS}')
+
+
+def daily_flows(days, amounts, today):
+    """(spending, income) per day from the first dated day to ``today``, both as positive amounts."""
+    today_number = (today - EPOCH).days
+    keep = (days != NO_DAY) & (days <= today_number)
+    days, amounts = days[keep], amounts[keep]
+    if not len(days):
+        return np.zeros(0), np.zeros(0)
+    offsets = days - days.min()
+    length = today_number - int(days.min()) + 1
+    spending = np.bincount(offsets, weights=np.where(amounts < 0, -amounts, 0.0), minlength=length)
+    income = np.bincount(offsets, weights=np.where(amounts > 0, amounts, 0.0), minlength=length)
+    return spending, income
+
+
+def _last(daily, window):
+    """The last ``window`` days of ``daily``, zero-padded in front when the history is shorter."""
+    return np.pad(daily[-window:], (max(window - len(daily), 0), 0))
+
+
+def project(days, amounts, balance, today, rules=(), horizons=HORIZONS):
+    """Forecast per horizon from the history in ``days``/``amounts`` (NumPy arrays).
+
+    ``rules`` are recurrence rules whose payments after ``today`` are
+    expected income; their past payments must not be in the history too.
+    """
+    spending, income = daily_flows(days, amounts, today)
+    # days before the first record count as days without money in or out, so
+    # a gift received yesterday is not projected as a daily income
+    recent = _last(spending, SPEND_WINDOW)
+    spend_mean, spend_std = float(recent.mean()), float(recent.std(ddof=1))
+    income_rate = float(_last(income, INCOME_WINDOW).mean())
+
+    forecasts = []
+    for horizon in horizons:
+        end = horizon_end(today, horizon)
+        left = (end - today).days
+        recurring = amount_between(rules, today + datetime.timedelta(days=1), end) if left else 0.0
+        expected = balance + recurring + income_rate * left - spend_mean * left
+        spread = BAND_Z * spend_std * math.sqrt(left)
+        forecasts.append(Forecast(horizon, end, left, expected, expected - spread, expected + spread))
+    return forecasts
+
+
+# --- The transactions table (app (77).py) ---
+def income_rules():
+    """The stored rules that pay into the balance: pocket money and the trash reward the settings chose."""
+    rules = get_rules()
+    names = (*INCOME_RULES, TRASH_RULES.get(get_settings().trash_type))
+    return tuple(rules[name] for name in names if name in rules)
+
+
+@cached_read
+def _transactions_forecast(today):
+    with connection() as conn:
+        history = np.fromiter(conn.execute(TRANSACTIONS_SQL), dtype=[('day', 'i8'), ('amount', 'f8')])
+    return project(history['day'], history['amount'], get_total(), today, income_rules())
+
+
+def forecast_transactions(today=None):
+    """Forecasts for the transactions ledger, where expenses are stored as negative amounts.
+
+    Pocket money and the trash reward are projected from their rules. Eid
+    money is in the balance but isn't projected as income.
+    """
+    return _transactions_forecast(today or datetime.date.today())
+
+
+# --- The CLI's in-memory Ledger (app.py_Microsoft) ---
+_ledger_cache = VersionedCache(max_entries=16)
+
+
+def _ledger_history(ledger):
+    entries = [(entry['date'], entry['amount']) for entry in ledger.income.values()]
+    entries += [(entry['date'], -entry['amount']) for entry in ledger.expenses.values()]
+    days = np.fromiter(((datetime.date.fromisoformat(date) - EPOCH).days if date else NO_DAY
+                        for date, _ in entries), dtype=np.int64, count=len(entries))
+    amounts = np.fromiter((amount for _, amount in entries), dtype=np.float64, count=len(entries))
+    return days, amounts
+
+
+def forecast_ledger(ledger, today=None):
+    """Forecasts for a Ledger; entries from before it recorded dates only count towards the balance."""
+    today = today or datetime.date.today()
+    return _ledger_cache.get((id(ledger), today), lambda: ledger.version,
+                             lambda: project(*_ledger_history(ledger), ledger.balance, today))
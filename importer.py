@@ -0,0 +1,156 @@
+import csv
+import datetime
+import io
+import sys
+from functools import lru_cache
+from itertools import islice
+
+from storage import DEFAULT_CATEGORY, DEFAULT_PERIOD, insert_expenses, transaction
+
+CHUNK_SIZE = 10_000
+IMPORT_CACHE_KB = 64 * 1024  # SQLite page cache while importing
+
+# Header names seen in our own exports and in bank statements, lower-cased.
+COLUMN_ALIASES = {
+    'name': ['name', 'item', 'description', 'details', 'narrative', 'merchant', 'الوصف'],
+    'category': ['category', 'الفئة'],
+    'amount': ['amount', 'debit', 'value', 'withdrawal', 'المبلغ'],
+    'period': ['period', 'الفترة'],
+    'date': ['date', 'transaction date', 'posting date', 'value date', 'التاريخ'],
+}
+# Columns holding only money going out; any other amount column is signed, credits positive.
+DEBIT_COLUMNS = ['debit', 'withdrawal']
+DATE_FORMATS = ['%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d']
+
+
+def _columns(header):
+    """Map each field to its position in the header (or None when the file lacks it)."""
+    normalized = [h.strip().lower() for h in header]
+    positions = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        positions[field] = next((normalized.index(a) for a in aliases if a in normalized), None)
+    if positions['amount'] is None:
+        raise ValueError(f'no amount column in header {header!r}')
+    return positions
+
+
+def _signed(header, positions):
+    """Whether the amounts are signed, expenses negative: a statement's amount or value column.
+
+    Files with a period column are in our own layout (exports, lists kept by
+    hand), where the amounts are the expenses themselves.
+    """
+    return header[positions['amount']].strip().lower() not in DEBIT_COLUMNS and positions['period'] is None
+
+
+def _amount(text):
+    text = text.replace(',', '').replace('﷼', '').replace('SAR', '').strip()
+    return float(text)
+
+
+@lru_cache(maxsize=4096)  # statements repeat the same few hundred dates
+def _date(text):
+    text = text.strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(text, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_rows(reader, positions, period, stats, signed=False):
+    """Yield (name, category, amount, period, date) tuples, counting rows that can't be parsed.
+
+    With ``signed`` amounts, positive rows are money coming in: they are
+    counted as credits and left out.
+    """
+    today = datetime.date.today().isoformat()
+    name_at, category_at, amount_at, period_at, date_at = (positions[field] for field in COLUMN_ALIASES)
+
+    for row in reader:
+        if not any(row):
+            continue
+        width = len(row)
+        try:
+            amount = _amount(row[amount_at] if amount_at < width else '')
+        except ValueError:
+            stats['skipped'] += 1
+            continue
+        if signed and amount > 0:
+            stats['credits'] += 1
+            continue
+        yield (row[name_at].strip() if name_at is not None and name_at < width else '',
+               (row[category_at].strip() if category_at is not None and category_at < width else '')
+               or DEFAULT_CATEGORY,
+               abs(amount),  # debits may be listed as negative amounts either way
+               (row[period_at].strip() if period_at is not None and period_at < width else '') or period,
+               (_date(row[date_at]) if date_at is not None and date_at < width else None) or today)
+
+
+def import_csv(stream, period=DEFAULT_PERIOD, chunk_size=CHUNK_SIZE, progress=None, total_bytes=None):
+    """Stream a CSV of expenses into the database in one transaction.
+
+    ``stream`` is a binary file object. Rows are parsed and inserted
+    ``chunk_size`` at a time, so memory does not grow with the file.
+    ``progress(rows, fraction)`` is called after every chunk; ``fraction`` is
+    None when the total size is unknown. Either every row goes in or none does.
+    Returns ``{'imported': n, 'skipped': m, 'credits': c}``, credits being the
+    incoming rows of a statement with signed amounts.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    stats = {'imported': 0, 'skipped': 0, 'credits': 0}
+    try:
+        reader = csv.reader(text)
+        header = next(reader, None)
+        if header is None:
+            return stats
+        positions = _columns(header)
+        rows = parse_rows(reader, positions, period, stats, _signed(header, positions))
+        with transaction() as conn:
+            cache_size = conn.execute('PRAGMA cache_size').fetchone()[0]
+            # room for the date index's random inserts; bounded, unlike the file
+            conn.execute(f'PRAGMA cache_size=-{IMPORT_CACHE_KB}')
+            try:
+                while True:
+                    chunk = list(islice(rows, chunk_size))
+                    if not chunk:
+                        break
+                    stats['imported'] += insert_expenses(conn, chunk)
+                    if progress is not None:
+                        fraction = min(stream.tell() / total_bytes, 1.0) if total_bytes else None
+                        progress(stats['imported'], fraction)
+            finally:
+                conn.execute(f'PRAGMA cache_size={cache_size}')
+    finally:
+        text.detach()  # leave the caller's stream open
+    return stats
+
+
+if __name__ == '__main__':
+    import argparse
+    import os
+    import time
+
+    import storage
+
+    parser = argparse.ArgumentParser(description='Import a CSV / bank statement into the expenses table')
+    parser.add_argument('csv_file')
+    parser.add_argument('--period', default=DEFAULT_PERIOD, help='period for rows without a period column')
+    parser.add_argument('--db', default=storage.DB_PATH)
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    storage.configure(args.db)
+    start = time.perf_counter()
+
+    def report(rows, fraction):
+        done = f' {fraction:6.1%}' if fraction is not None else ''
+        print(f'\r{rows:>10} rows{done}', end='', file=sys.stderr, flush=True)
+
+    with open(args.csv_file, 'rb') as f:
+        stats = import_csv(f, args.period, args.chunk_size, report, os.path.getsize(args.csv_file))
+    elapsed = time.perf_counter() - start
+    print(file=sys.stderr)
+    print(f'imported {stats["imported"]} rows ({stats["skipped"]} skipped, {stats["credits"]} credits) '
+          f'in {elapsed:.1f}s')
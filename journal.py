@@ -0,0 +1,111 @@
+import json
+import os
+
+from ledger import Ledger
+
+COMPACT_EVERY = 1000  # minimum journal entries between snapshots
+
+
+def _write_atomic(path, text):
+    """Write to a temp file, fsync it, then rename over ``path`` so readers see old or new, never half."""
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    if hasattr(os, 'O_DIRECTORY'):
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+class Journal:
+    """Snapshot file plus an append-only JSONL log of the operations since it was taken.
+
+    Every entry carries a sequence number and the snapshot stores the last one
+    it includes, so a crash between writing a snapshot and truncating the log
+    never replays an operation twice. A torn final line is ignored on load.
+
+    ``model`` is the in-memory type the journal rebuilds: it needs ``apply(op)``,
+    ``to_dict()`` and a ``from_dict(dict)`` classmethod.
+    """
+
+    def __init__(self, path, compact_every=COMPACT_EVERY, model=Ledger):
+        self.path = path
+        self.log_path = path + '.journal'
+        self.compact_every = compact_every
+        self.model = model
+        self.seq = 0
+        self.pending = 0
+        self.log_bytes = 0
+        self.snapshot_bytes = 0
+        self._log = None
+
+    def load(self):
+        """Latest snapshot with the journal tail replayed on top."""
+        snapshot = {}
+        self.snapshot_bytes = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                snapshot = json.load(f)
+        snapshot_seq = snapshot.pop('seq', 0)
+        data = self.model.from_dict(snapshot)
+        self.seq = snapshot_seq
+        self.pending = 0
+        if os.path.exists(self.log_path):
+            valid = 0
+            with open(self.log_path, 'rb') as f:
+                for line in f:
+                    try:
+                        if not line.endswith(b'\n'):
+                            raise ValueError
+                        op = json.loads(line)
+                    except ValueError:
+                        break  # torn write at the end of the log
+                    valid += len(line)
+                    if op['seq'] <= snapshot_seq:
+                        continue
+                    data.apply(op)
+                    self.seq = op['seq']
+                    self.pending += 1
+            if valid < os.path.getsize(self.log_path):
+                os.truncate(self.log_path, valid)  # so new entries don't land on the torn line
+            self.log_bytes = valid
+        return data
+
+    def record(self, data, op):
+        """Append ``op`` (already applied to ``data``) and compact once enough have piled up.
+
+        Compaction waits until the journal is at least as large as the snapshot,
+        so the cost of rewriting the snapshot stays amortized O(1) per operation.
+        """
+        self.seq += 1
+        line = json.dumps(dict(op, seq=self.seq)) + '\n'
+        if self._log is None:
+            self._log = open(self.log_path, 'a')
+        self._log.write(line)
+        self._log.flush()
+        self.pending += 1
+        self.log_bytes += len(line.encode())
+        if self.pending >= self.compact_every and self.log_bytes >= self.snapshot_bytes:
+            self.compact(data)
+
+    def compact(self, data):
+        """Write a full snapshot atomically and start an empty journal."""
+        snapshot = json.dumps(dict(data.to_dict(), seq=self.seq), indent=4)
+        _write_atomic(self.path, snapshot)
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        _write_atomic(self.log_path, '')
+        self.pending = 0
+        self.log_bytes = 0
+        self.snapshot_bytes = len(snapshot.encode())
+
+    def close(self):
+        if self._log is not None:
+            self._log.close()
+            self._log = None
@@ -0,0 +1,71 @@
+from collections import deque
+
+
+class Ledger:
+    """The CLI's income and expenses with running totals and an (amount, category) index.
+
+    Balance is read from the totals and ``remove`` pops the oldest matching
+    expense from its index bucket, so both are O(1) however long the history.
+    """
+
+    def __init__(self):
+        self.income = {}          # id -> {'amount', 'source', 'date'}, in insertion order
+        self.expenses = {}        # id -> {'amount', 'category', 'date'}, in insertion order
+        self.total_income = 0.0
+        self.total_expenses = 0.0
+        self._by_key = {}         # (amount, category) -> deque of expense ids, oldest first
+        self._next_id = 0
+        self.version = 0          # bumped on every change, for caches of derived values
+
+    def _new_id(self):
+        self._next_id += 1
+        return self._next_id
+
+    def add_income(self, amount, source, date=None):
+        self.income[self._new_id()] = {'amount': amount, 'source': source, 'date': date}
+        self.total_income += amount
+        self.version += 1
+
+    def spend(self, amount, category, date=None):
+        expense_id = self._new_id()
+        self.expenses[expense_id] = {'amount': amount, 'category': category, 'date': date}
+        self._by_key.setdefault((amount, category), deque()).append(expense_id)
+        self.total_expenses += amount
+        self.version += 1
+
+    def remove(self, amount, category):
+        """Drop the oldest expense with this amount and category; False if there is none."""
+        bucket = self._by_key.get((amount, category))
+        if not bucket:
+            return False
+        expense = self.expenses.pop(bucket.popleft())
+        if not bucket:
+            del self._by_key[(amount, category)]
+        self.total_expenses -= expense['amount']
+        self.version += 1
+        return True
+
+    @property
+    def balance(self):
+        return self.total_income - self.total_expenses
+
+    # --- Journal hooks ---
+    def apply(self, op):
+        if op['op'] == 'add_income':
+            self.add_income(op['amount'], op['source'], op.get('date'))
+        elif op['op'] == 'spend':
+            self.spend(op['amount'], op['category'], op.get('date'))
+        elif op['op'] == 'remove':
+            self.remove(op['amount'], op['category'])
+
+    def to_dict(self):
+        return {'income': list(self.income.values()), 'expenses': list(self.expenses.values())}
+
+    @classmethod
+    def from_dict(cls, data):
+        ledger = cls()
+        for entry in data.get('income', []):
+            ledger.add_income(entry['amount'], entry['source'], entry.get('date'))
+        for entry in data.get('expenses', []):
+            ledger.spend(entry['amount'], entry['category'], entry.get('date'))
+        return ledger
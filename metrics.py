@@ -0,0 +1,273 @@
+"""Per-statement and per-rerun timings, exported as OpenMetrics text.
+
+Off unless RIYAL_METRICS=1. When on, pooled connections use an instrumented
+cursor that records latency, rows and calls for every statement, ``Rerun``
+times each rerun under its UI section, and a local endpoint serves
+http://127.0.0.1:RIYAL_METRICS_PORT/metrics for Prometheus to scrape.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ENABLED = os.environ.get('RIYAL_METRICS', '') not in ('', '0')
+HOST = '127.0.0.1'
+PORT = int(os.environ.get('RIYAL_METRICS_PORT', '9464'))
+SAMPLES = 2048          # latest latencies kept per series for the quantiles
+QUANTILES = (0.5, 0.99)
+
+_WHITESPACE = re.compile(r'\s+')
+_PLACEHOLDERS = re.compile(r'\?(?:\s*,\s*\?)+')
+
+
+@lru_cache(maxsize=1024)  # the app runs a few dozen distinct statement texts
+def normalize(sql):
+    """One line per statement shape: whitespace collapsed, ``?, ?, ?`` lists folded."""
+    return _PLACEHOLDERS.sub('?, ...', _WHITESPACE.sub(' ', sql).strip())
+
+
+class Series:
+    """Call count, row count, total time and a window of recent latencies."""
+
+    def __init__(self):
+        self.calls = 0
+        self.rows = 0
+        self.seconds = 0.0
+        self.samples = deque(maxlen=SAMPLES)
+
+    def observe(self, seconds, rows=0):
+        self.calls += 1
+        self.rows += rows
+        self.seconds += seconds
+        self.samples.append(seconds)
+
+    def quantile(self, q):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class Registry:
+    def __init__(self):
+        self.statements = {}  # normalized sql -> Series
+        self.sections = {}    # UI section -> Series of rerun wall times
+        self._lock = threading.Lock()
+
+    def observe_statement(self, sql, seconds, rows):
+        sql = normalize(sql)
+        with self._lock:
+            series = self.statements.get(sql)
+            if series is None:
+                series = self.statements[sql] = Series()
+            series.observe(seconds, rows)
+        rerun = getattr(_local, 'rerun', None)
+        if rerun is not None:
+            rerun.observe(sql, seconds, rows)
+
+    def observe_section(self, section, seconds):
+        with self._lock:
+            series = self.sections.get(section)
+            if series is None:
+                series = self.sections[section] = Series()
+            series.observe(seconds)
+
+    def section_quantiles(self):
+        """{section: (reruns, p50, p99)} in seconds."""
+        with self._lock:
+            return {name: (s.calls, *(s.quantile(q) for q in QUANTILES)) for name, s in self.sections.items()}
+
+    def render(self):
+        """The registry in the OpenMetrics text format (also valid Prometheus text)."""
+        lines = []
+        with self._lock:
+            for metric, label, table, help_text in (
+                    ('riyal_sql_statement_seconds', 'statement', self.statements, 'SQLite statement latency'),
+                    ('riyal_rerun_seconds', 'section', self.sections, 'Streamlit rerun wall time per UI section')):
+                lines.append(f'# TYPE {metric} summary')
+                lines.append(f'# HELP {metric} {help_text}.')
+                for key, series in table.items():
+                    value = _escape(key)
+                    for q in QUANTILES:
+                        lines.append(f'{metric}{{{label}="{value}",quantile="{q}"}} {series.quantile(q):.9f}')
+                    lines.append(f'{metric}_sum{{{label}="{value}"}} {series.seconds:.9f}')
+                    lines.append(f'{metric}_count{{{label}="{value}"}} {series.calls}')
+            lines.append('# TYPE riyal_sql_statement_rows counter')
+            lines.append('# HELP riyal_sql_statement_rows Rows returned or changed per SQLite statement.')
+            for key, series in self.statements.items():
+                lines.append(f'riyal_sql_statement_rows_total{{statement="{_escape(key)}"}} {series.rows}')
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+registry = Registry()
+_local = threading.local()  # the rerun running on this thread, if any
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that reports each statement once it is done: exhausted, re-executed, closed or dropped.
+
+    Latency covers execute() plus every fetch, so a SELECT that streams many
+    rows is charged for all of them.
+    """
+    _sql = None
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        start = time.perf_counter()
+        super().execute(sql, parameters)
+        self._sql, self._seconds, self._rows = sql, time.perf_counter() - start, 0
+        self._returns_rows = self.description is not None
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        start = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        registry.observe_statement(sql, time.perf_counter() - start, max(self.rowcount, 0))
+        return self
+
+    def _fetched(self, start, rows, done):
+        if self._sql is None:
+            return
+        self._seconds += time.perf_counter() - start
+        self._rows += rows
+        if done:
+            self._finish()
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(start, row is not None, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(start, len(rows), not rows)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, len(rows), True)
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(start, 0, True)
+            raise
+        self._fetched(start, 1, False)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish()
+
+    def _finish(self):
+        if self._sql is None:
+            return
+        rows = self._rows if self._returns_rows else max(self.rowcount, 0)
+        registry.observe_statement(self._sql, self._seconds, rows)
+        self._sql = None
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connection_factory():
+    """The sqlite3 connection class new pooled connections should use."""
+    return InstrumentedConnection if ENABLED else sqlite3.Connection
+
+
+class Rerun:
+    """Wall time and statements of one script run, filed under its UI section.
+
+    Create it where the section is known and call ``finish()`` at the end of
+    the script; statements executed on this thread in between are collected.
+    """
+
+    def __init__(self, section):
+        self.section = section
+        self.statements = {}  # normalized sql -> [calls, rows, seconds]
+        self.seconds = None
+        self._start = time.perf_counter()
+        _local.rerun = self
+        if ENABLED:
+            serve()
+
+    def observe(self, sql, seconds, rows):
+        entry = self.statements.get(sql)
+        if entry is None:
+            entry = self.statements[sql] = [0, 0, 0.0]
+        entry[0] += 1
+        entry[1] += rows
+        entry[2] += seconds
+
+    def finish(self):
+        if self.seconds is None:
+            self.seconds = time.perf_counter() - self._start
+            registry.observe_section(self.section, self.seconds)
+            if getattr(_local, 'rerun', None) is self:
+                _local.rerun = None
+        return self
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = registry.render().encode()
+        if 'application/openmetrics-text' in self.headers.get('Accept', ''):
+            content_type = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+        else:
+            content_type = 'text/plain; version=0.0.4; charset=utf-8'
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # scrapes every few seconds would flood the app's console
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def serve(host=HOST, port=PORT):
+    """Start the /metrics endpoint once per process; returns the server (None if the port is taken)."""
+    global _server
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), _Handler)
+            except OSError:
+                _server = False  # another process already serves this port; don't retry every rerun
+            else:
+                threading.Thread(target=_server.serve_forever, name='metrics', daemon=True).start()
+        return _server or None
@@ -0,0 +1,197 @@
+"""Schema migrations, applied in order and recorded in ``PRAGMA user_version``.
+
+Every layout the app ever wrote is upgraded to the one canonical schema:
+
+* pocket_money.db from the riyaltacker_full variants, whose ``settings``
+  table had whichever columns the variant that created it used;
+* pocket_money.db from app.py, whose expenses had no category or period;
+* riyaltacker.db (expenses with ``item``, dated eid_money, rewards) and
+  riyals.db (transactions), which are merged into pocket_money.db.
+
+A database already at SCHEMA_VERSION costs one PRAGMA read and no DDL.
+To change the schema, append a step to MIGRATIONS; never edit a shipped one.
+"""
+import os
+import sqlite3
+
+import recurrence
+import search
+import settings
+import storage
+import tokens
+from storage import (DEFAULT_CATEGORY, DEFAULT_PERIOD, GIVER_INDEXES, GIVER_TRIGGERS, INDEXES, ROLLUP_TRIGGERS, SCHEMA,
+                     rebuild_aggregates, rebuild_givers, rebuild_rollup, with_backoff)
+
+LEGACY_FILES = ['riyaltacker.db', 'riyals.db']  # merged into DB_PATH when found next to it
+
+# Canonical columns of each table (after id) -> the names they had in older layouts.
+COLUMN_SOURCES = {
+    'expenses': {'name': ['name', 'item'], 'category': ['category'], 'amount': ['amount'],
+                 'period': ['period'], 'date': ['date']},
+    'eid_money': {'giver': ['giver'], 'amount': ['amount'], 'date': ['date']},
+    'rewards': {'type': ['type'], 'amount': ['amount'], 'date': ['date']},
+    'transactions': {'type': ['type'], 'amount': ['amount'], 'note': ['note'], 'date': ['date']},
+}
+# Value for a canonical column an old layout never had; anything else is NULL.
+FILL = {'category': DEFAULT_CATEGORY, 'period': DEFAULT_PERIOD}
+
+
+def schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def _columns(conn, table):
+    return [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+
+
+def _sources(table, columns):
+    """SELECT expressions producing ``table``'s canonical columns from an old layout's ``columns``."""
+    expressions = []
+    for column, names in COLUMN_SOURCES[table].items():
+        source = next((name for name in names if name in columns), None)
+        if source is None:
+            source = f"'{FILL[column]}'" if column in FILL else 'NULL'
+        expressions.append(source)
+    return expressions
+
+
+def _create_tables(conn):
+    for ddl in SCHEMA + settings.SCHEMA + recurrence.SCHEMA:
+        conn.execute(ddl)
+
+
+def _conform(conn, table):
+    """Rebuild ``table`` in the canonical layout if it exists in any other one, keeping ids."""
+    columns = _columns(conn, table)
+    canonical = ['id', *COLUMN_SOURCES[table]]
+    if not columns or columns == canonical:
+        return
+    conn.execute(f'ALTER TABLE {table} RENAME TO {table}_old')
+    _create_tables(conn)
+    conn.execute(f'INSERT INTO {table} ({", ".join(canonical)}) '
+                 f'SELECT id, {", ".join(_sources(table, columns))} FROM {table}_old')
+    conn.execute(f'DROP TABLE {table}_old')
+
+
+# --- Steps: each takes the connection inside the migration transaction ---
+def _canonical_tables(conn):
+    """1: one layout for every table, and the legacy settings row copied into app_settings."""
+    for table in COLUMN_SOURCES:
+        _conform(conn, table)
+    _create_tables(conn)
+    if not conn.execute('SELECT 1 FROM app_settings LIMIT 1').fetchone():
+        settings.import_legacy(conn)
+
+
+def _merge_legacy_files(conn):
+    """2: copy the rows of riyaltacker.db and riyals.db into pocket_money.db.
+
+    The old files are read, not changed; merged rows get new ids.
+    """
+    path = conn.execute('PRAGMA database_list').fetchone()[2]
+    if not path or os.path.basename(path) != os.path.basename(storage.DB_PATH):
+        return
+    directory = os.path.dirname(path)
+    for name in LEGACY_FILES:
+        legacy_path = os.path.join(directory, name)
+        if not os.path.exists(legacy_path):
+            continue
+        legacy = sqlite3.connect(f'file:{legacy_path}?mode=ro', uri=True)
+        try:
+            for table in COLUMN_SOURCES:
+                columns = _columns(legacy, table)
+                if not columns:
+                    continue
+                rows = legacy.execute(f'SELECT {", ".join(_sources(table, columns))} FROM {table} ORDER BY id')
+                marks = ', '.join('?' * len(COLUMN_SOURCES[table]))
+                conn.executemany(f'INSERT INTO {table} ({", ".join(COLUMN_SOURCES[table])}) VALUES ({marks})', rows)
+        finally:
+            legacy.close()
+
+
+def _indexes(conn):
+    """3: the expense indexes the list, page and range queries are planned with."""
+    for ddl in INDEXES:
+        conn.execute(ddl)
+
+
+def _monthly_rollup(conn):
+    """4: monthly_rollup, its triggers, and its rows for the expenses already there."""
+    _create_tables(conn)
+    for ddl in ROLLUP_TRIGGERS:
+        conn.execute(ddl)
+    rebuild_rollup(conn)
+
+
+def _recurring_income(conn):
+    """5: recurring_income, seeded with the pocket money and rewards the variants hardcoded."""
+    _create_tables(conn)
+    recurrence.seed_defaults(conn)
+
+
+def _eid_givers(conn):
+    """6: eid_givers, its triggers and indexes, and its rows for the gifts already there."""
+    _create_tables(conn)
+    for ddl in GIVER_TRIGGERS + GIVER_INDEXES:
+        conn.execute(ddl)
+    rebuild_givers(conn)
+
+
+def _search(conn):
+    """7: full-text indexes of expense names and categories and transaction notes, and their triggers."""
+    for ddl in search.SCHEMA:
+        conn.execute(ddl)
+    search.rebuild(conn)
+
+
+def _api_tokens(conn):
+    """8: api_tokens, the hashes of the tokens the JSON API accepts."""
+    for ddl in tokens.SCHEMA:
+        conn.execute(ddl)
+
+
+MIGRATIONS = [_canonical_tables, _merge_legacy_files, _indexes, _monthly_rollup, _recurring_income, _eid_givers,
+              _search, _api_tokens]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def migrate(conn):
+    """Apply the pending steps in one transaction; returns the versions applied.
+
+    ``conn`` must not be inside a transaction. A current database is left
+    untouched, so this is cheap enough to call whenever a database is opened.
+    """
+    if schema_version(conn) >= SCHEMA_VERSION:
+        return []
+    with_backoff(lambda: conn.execute('BEGIN IMMEDIATE'))
+    try:
+        version = schema_version(conn)  # another process may have migrated while we waited
+        applied = []
+        for number, step in enumerate(MIGRATIONS[version:], version + 1):
+            step(conn)
+            applied.append(number)
+        if applied:
+            rebuild_aggregates(conn)  # rows moved, so totals are recomputed from the base tables
+            conn.execute(f'PRAGMA user_version={SCHEMA_VERSION}')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    with_backoff(lambda: conn.execute('COMMIT'))
+    return applied
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Upgrade a Riyal Tracker database to the current schema')
+    parser.add_argument('--db', default=storage.DB_PATH)
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db, isolation_level=None)
+    before = schema_version(conn)
+    applied = migrate(conn)
+    conn.close()
+    if applied:
+        print(f'{args.db}: version {before} -> {SCHEMA_VERSION} (applied {", ".join(map(str, applied))})')
+    else:
+        print(f'{args.db}: already at version {before}')
@@ -0,0 +1,14 @@
+"""Choices the app variants offer, built once per process instead of on every rerun."""
+
+CATEGORIES = ('Food', 'Online Shopping', 'Stores', 'Toys', 'Other')
+CATEGORY_ICONS = {'Food': '🍔 طعام', 'Online Shopping': '🛒 تسوق أونلاين', 'Stores': '🏬 المتاجر',
+                  'Toys': '🧸 ألعاب', 'Other': '📦 أخرى'}
+PERIODS = ('Week', 'Month', 'Year')
+MENU = ('Main', 'Settings', 'Eid Money', 'Import', 'History', 'Analytics', 'Search')  # sidebar sections
+TRASH_OPTIONS = ('None', '10 ﷼ في الأسبوع', '50 ﷼ في الشهر')
+TRASH_RULES = {'None': None, '10 ﷼ في الأسبوع': 'trash_weekly', '50 ﷼ في الشهر': 'trash_monthly'}  # recurrence rule names
+FONTS = ('Arial', 'Courier', 'Times New Roman')
+
+# riyaltacker_full 33.py stores Arabic labels as the category and period themselves.
+ARABIC_CATEGORIES = ('طعام', 'تسوق أونلاين', 'المتاجر', 'ألعاب', 'أخرى')
+ARABIC_PERIODS = ('أسبوع', 'شهر', 'سنة')
@@ -0,0 +1,150 @@
+"""Recurring income (pocket money, chore rewards, budgets) as rules, and how much of it falls in a date range.
+
+A rule pays ``amount`` every day, week, month or year from ``start`` until
+``end`` (inclusive, None for open-ended), on the start's weekday, day of
+the month, or day of the year; a monthly rule starting on the 31st pays on
+the last day of shorter months. Occurrences in a range are counted with
+date arithmetic, never by walking the days, and the counts are memoized:
+the same few periods are asked for on every rerun.
+"""
+import datetime
+from collections import namedtuple
+from functools import lru_cache
+
+from storage import cached_read, connection, transaction
+
+FREQUENCIES = ('daily', 'weekly', 'monthly', 'yearly')
+PERIOD_FREQUENCY = {'Week': 'weekly', 'Month': 'monthly', 'Year': 'yearly'}  # a setting 'per period'
+# A Monday and the first of January: weekly rules from it pay on Mondays, monthly ones on the 1st.
+RULE_EPOCH = datetime.date(2001, 1, 1)
+
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS recurring_income (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL UNIQUE,
+        amount REAL NOT NULL,
+        frequency TEXT NOT NULL CHECK (frequency IN ('daily', 'weekly', 'monthly', 'yearly')),
+        start TEXT NOT NULL,
+        end TEXT
+    )''',
+]
+
+Rule = namedtuple('Rule', 'name amount frequency start end', defaults=(RULE_EPOCH, None))
+
+# What the app variants used to hardcode; seeded into every database by migration 5.
+DEFAULT_RULES = [
+    Rule('pocket_money', 50.0, 'monthly'),
+    Rule('trash_weekly', 10.0, 'weekly'),
+    Rule('trash_monthly', 50.0, 'monthly'),
+    Rule('monthly_budget', 1000.0, 'monthly'),
+]
+
+
+# --- Counting ---
+def _month_day(year, month, day):
+    """``day`` of the month, or its last day if the month is shorter."""
+    following = datetime.date(year + month // 12, month % 12 + 1, 1)
+    return datetime.date(year, month, min(day, (following - datetime.timedelta(days=1)).day))
+
+
+def _every_months(start, step, lo, hi):
+    """Occurrences of start + k*step months (k >= 0) within [lo, hi], where lo >= start."""
+    def index(date):  # months since start's month
+        return (date.year - start.year) * 12 + date.month - start.month
+
+    def occurrence(k):
+        months = start.month - 1 + k * step
+        return _month_day(start.year + months // 12, months % 12 + 1, start.day)
+
+    first = -(-index(lo) // step)  # ceil: the first whole step at or after lo's month
+    if occurrence(first) < lo:
+        first += 1
+    last = index(hi) // step
+    if last >= 0 and occurrence(last) > hi:
+        last -= 1
+    return max(last - first + 1, 0)
+
+
+@lru_cache(maxsize=4096)
+def occurrences(frequency, start, end, range_start, range_end):
+    """How many times a rule from ``start`` to ``end`` pays within [range_start, range_end]."""
+    lo = max(start, range_start)
+    hi = range_end if end is None else min(end, range_end)
+    if hi < lo:
+        return 0
+    if frequency == 'daily':
+        return (hi - lo).days + 1
+    if frequency == 'weekly':
+        first = -(-(lo - start).days // 7)
+        return max((hi - start).days // 7 - first + 1, 0)
+    if frequency == 'monthly':
+        return _every_months(start, 1, lo, hi)
+    if frequency == 'yearly':
+        return _every_months(start, 12, lo, hi)
+    raise ValueError(f'unknown frequency {frequency!r}, expected one of {FREQUENCIES}')
+
+
+def amount_between(rules, range_start, range_end):
+    """Total paid by ``rules`` within [range_start, range_end]."""
+    return sum(rule.amount * occurrences(rule.frequency, rule.start, rule.end, range_start, range_end)
+               for rule in rules if rule is not None)
+
+
+def period_range(period, today=None):
+    """First and last day of the calendar week (Monday to Sunday), month or year containing ``today``."""
+    today = today or datetime.date.today()
+    period = period.lower()
+    if period == 'week':
+        first = today - datetime.timedelta(days=today.weekday())
+        return first, first + datetime.timedelta(days=6)
+    if period == 'month':
+        return today.replace(day=1), _month_day(today.year, today.month, 31)
+    if period == 'year':
+        return today.replace(month=1, day=1), today.replace(month=12, day=31)
+    raise ValueError(f'unknown period {period!r}, expected Week, Month or Year')
+
+
+def period_amount(rules, period, today=None):
+    """Total paid by ``rules`` in the current calendar week, month or year."""
+    return amount_between(rules, *period_range(period, today))
+
+
+# --- Stored rules ---
+def _rule(row):
+    name, amount, frequency, start, end = row
+    return Rule(name, amount, frequency, datetime.date.fromisoformat(start),
+                datetime.date.fromisoformat(end) if end else None)
+
+
+@cached_read
+def get_rules():
+    """Every stored rule by name."""
+    with connection() as conn:
+        rows = conn.execute('SELECT name, amount, frequency, start, end FROM recurring_income ORDER BY id')
+        return {row[0]: _rule(row) for row in rows}
+
+
+def get_rule(name):
+    """The stored rule called ``name``, or None."""
+    return get_rules().get(name)
+
+
+def set_rule(name, amount, frequency, start=RULE_EPOCH, end=None):
+    """Create or replace the rule called ``name``."""
+    if frequency not in FREQUENCIES:
+        raise ValueError(f'unknown frequency {frequency!r}, expected one of {FREQUENCIES}')
+    if end is not None and end < start:
+        raise ValueError('a rule cannot end before it starts')
+    with transaction() as conn:
+        conn.execute('INSERT INTO recurring_income (name, amount, frequency, start, end) VALUES (?, ?, ?, ?, ?) '
+                     'ON CONFLICT (name) DO UPDATE SET amount=excluded.amount, frequency=excluded.frequency, '
+                     'start=excluded.start, end=excluded.end',
+                     (name, amount, frequency, start.isoformat(), end.isoformat() if end else None))
+
+
+def seed_defaults(conn):
+    """Insert the DEFAULT_RULES a database does not have yet."""
+    conn.executemany('INSERT OR IGNORE INTO recurring_income (name, amount, frequency, start, end) '
+                     'VALUES (?, ?, ?, ?, ?)',
+                     [(r.name, r.amount, r.frequency, r.start.isoformat(), None) for r in DEFAULT_RULES])
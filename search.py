@@ -0,0 +1,193 @@
+"""Full-text search over expense names and categories and transaction notes.
+
+Each source has an FTS5 table whose rowid is the source row's id, kept in
+step by triggers. The unicode61 tokenizer case-folds and strips Latin
+accents but splits Arabic words on their vowel marks, so the indexed text
+and the query are first folded the same way: marks and tatweel removed,
+alef, yaa and taa marbuta variants unified (FOLD). The triggers do it with
+nested replace() calls, so any connection can write, without a registered
+function.
+
+The FTS tables are contentless: rows are read back from their source by
+id. A common word can match a large share of the rows, so only the newest
+RANK_WINDOW matches are ranked (see rank()), a name match counting more
+than a category one: that bounds a search at a few milliseconds whatever
+the table size.
+"""
+import html
+import re
+import unicodedata
+from functools import lru_cache
+
+from storage import cached_read, connection
+
+ARABIC_MARKS = '\u064b-\u0652\u0670'  # tanween, short vowels, shadda, sukun, superscript alef
+FOLD = {
+    **{chr(c): '' for c in range(0x064b, 0x0653)}, '\u0670': '', '\u0640': '',  # marks, tatweel
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا', 'ى': 'ي', 'ة': 'ه',
+}
+_FOLD_TABLE = str.maketrans(FOLD)
+# A token as unicode61 sees it (letters and digits), plus the marks it would split on.
+WORD = re.compile(f'(?:[^\\W_]|[{ARABIC_MARKS}\u0300-\u036f])+')
+TOKENIZER = 'unicode61 remove_diacritics 2'
+LATIN_ACCENTS = re.compile('[\u0300-\u036f]')  # what remove_diacritics strips, once decomposed
+PREFIXES = (2, 3, 4, 5, 6)  # prefix lengths with their own index, read lazily like whole words
+RANK_WINDOW = 500
+LIMIT = 20
+BM25_K1, BM25_B = 1.2, 0.75
+MARK = '\x02', '\x03'  # around the matched words in the text search() returns
+
+
+def fold_sql(expression):
+    """``expression`` folded in SQL, for the triggers; text without anything to fold is passed through."""
+    folded = expression
+    for char, replacement in FOLD.items():
+        folded = f"replace({folded}, '{char}', '{replacement}')"
+    return f"CASE WHEN {expression} GLOB '*[{''.join(FOLD)}]*' THEN {folded} ELSE {expression} END"
+
+
+def fold(text):
+    return text.translate(_FOLD_TABLE)
+
+
+# (FTS table, source table, columns, weight of each column in the ranking)
+SOURCES = {
+    'expenses': ('expenses_fts', 'expenses', ('name', 'category'), (4.0, 1.0)),
+    'transactions': ('transactions_fts', 'transactions', ('note',), (1.0,)),
+}
+
+
+def _entry(fts, columns, row, command=None):
+    # the trigger statement adding (or, with command='delete', removing) a row's folded text
+    values = ', '.join(fold_sql(f"ifnull({row}.{c}, '')") for c in columns)
+    if command is None:
+        return f'INSERT INTO {fts} (rowid, {", ".join(columns)}) VALUES ({row}.id, {values});'
+    return f"INSERT INTO {fts} ({fts}, rowid, {', '.join(columns)}) VALUES ('{command}', {row}.id, {values});"
+
+
+def _ddl(fts, table, columns):
+    add, remove = _entry(fts, columns, 'NEW'), _entry(fts, columns, 'OLD', 'delete')
+    return [
+        # contentless: the text is read from the source table, the index only stores positions
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({', '.join(columns)}, content='', "
+        f"tokenize='{TOKENIZER}', prefix='{' '.join(map(str, PREFIXES))}')",
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN {add} END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN {remove} END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {", ".join(columns)} ON {table} '
+        f'BEGIN {remove} {add} END',
+    ]
+
+
+SCHEMA = [ddl for fts, table, columns, _ in SOURCES.values() for ddl in _ddl(fts, table, columns)]
+
+
+def rebuild(conn):
+    """Refill the FTS tables from their sources."""
+    for fts, table, columns, _ in SOURCES.values():
+        conn.execute(f"INSERT INTO {fts} ({fts}) VALUES ('delete-all')")
+        folded = ', '.join(fold_sql(f"ifnull({c}, '')") for c in columns)
+        conn.execute(f'INSERT INTO {fts} (rowid, {", ".join(columns)}) SELECT id, {folded} FROM {table}')
+        conn.execute(f"INSERT INTO {fts} ({fts}) VALUES ('optimize')")
+
+
+@lru_cache(maxsize=65536)
+def _key(word):
+    # what the tokenizer indexes the word as: folded, accents stripped, case-folded
+    if word.isascii():
+        return word.lower()
+    decomposed = unicodedata.normalize('NFD', fold(word).casefold())
+    return unicodedata.normalize('NFC', LATIN_ACCENTS.sub('', decomposed))
+
+
+def _terms(text):
+    return [_key(word) for word in WORD.findall(text or '')]
+
+
+def match_query(terms, prefix=False):
+    """FTS5 query matching rows with all of ``terms``, the last one as a prefix if ``prefix``."""
+    return ' '.join(f'"{term}"' for term in terms) + ('*' if prefix else '')
+
+
+def _matcher(terms, prefix):
+    """Whether a word (as _key() has it) matches one of ``terms``, the last one as a prefix if ``prefix``."""
+    whole, last = set(terms[:-1] if prefix else terms), terms[-1]
+    if prefix:
+        return lambda key: key in whole or key.startswith(last)
+    return whole.__contains__
+
+
+def highlight(text, terms, prefix=False):
+    """``text`` with the words matching ``terms`` between the MARK characters."""
+    matches = _matcher(terms, prefix)
+
+    def mark(match):
+        return f'{MARK[0]}{match.group()}{MARK[1]}' if matches(_key(match.group())) else match.group()
+
+    return WORD.sub(mark, text or '')
+
+
+def rank(rows, columns, weights, terms, prefix=False):
+    """``rows`` best first, by the term frequency and length parts of bm25 over the text ``columns``.
+
+    FTS5's own bm25() also weighs each term by how rare it is, and finding
+    that out reads the term's whole posting list: 10 ms for a category that
+    a fifth of a million expenses have. Every row here contains every term,
+    so only how often and in how short a text they occur tells them apart.
+    """
+    matches = _matcher(terms, prefix)
+    counted = {}  # text -> (matching words, words); categories and names repeat
+
+    def count(text):
+        if text not in counted:
+            words = _terms(text)
+            counted[text] = sum(map(matches, words)), len(words)
+        return counted[text]
+
+    stats = [[count(row[c]) for c in columns] for row in rows]
+    average = [max(sum(s[i][1] for s in stats) / max(len(rows), 1), 1.0) for i in range(len(columns))]
+
+    def score(item):
+        total = 0.0
+        for weight, (hits, length), avg in zip(weights, stats[item], average):
+            total += weight * hits / (hits + BM25_K1 * (1 - BM25_B + BM25_B * length / avg))
+        return -total, -rows[item][0]  # best first, then newest
+
+    return [rows[i] for i in sorted(range(len(rows)), key=score)]
+
+
+def to_html(marked):
+    """A highlighted string from search() as escaped HTML, the matches in <mark>."""
+    return html.escape(marked).replace(MARK[0], '<mark>').replace(MARK[1], '</mark>')
+
+
+# FTS5 returns matches in rowid order, so the newest RANK_WINDOW are read without touching the rest.
+_SEARCH_SQL = {
+    'expenses': ('SELECT id, name, category, amount, date FROM expenses WHERE id IN '
+                 '(SELECT rowid FROM expenses_fts WHERE expenses_fts MATCH ? ORDER BY rowid DESC LIMIT ?)'),
+    'transactions': ('SELECT id, type, amount, note, date FROM transactions WHERE id IN '
+                     '(SELECT rowid FROM transactions_fts WHERE transactions_fts MATCH ? ORDER BY rowid DESC LIMIT ?)'),
+}
+_TEXT_COLUMNS = {'expenses': (1, 2), 'transactions': (3,)}
+
+
+@cached_read
+def search(source, text, limit=LIMIT):
+    """Best matches of what was typed in 'expenses' (id, name, category, amount, date) or
+    'transactions' (id, type, amount, note, date), the matching words between MARKs.
+
+    Rows must contain every word, the last one as a prefix. A last word
+    longer than the PREFIXES is looked up whole first: a prefix without an
+    index of its own reads every matching term's postings up front.
+    """
+    terms = _terms(text)
+    if not terms:
+        return []
+    columns = _TEXT_COLUMNS[source]
+    with connection() as conn:
+        for prefix in (True,) if len(terms[-1]) <= PREFIXES[-1] else (False, True):
+            rows = conn.execute(_SEARCH_SQL[source], (match_query(terms, prefix), RANK_WINDOW)).fetchall()
+            if rows:
+                break
+    best = rank(rows, columns, SOURCES[source][3], terms, prefix)[:limit]
+    return [tuple(highlight(value, terms, prefix) if i in columns else value for i, value in enumerate(row))
+            for row in best]
@@ -0,0 +1,155 @@
+import datetime
+import re
+import threading
+from dataclasses import dataclass, fields
+
+from options import FONTS, PERIODS, TRASH_OPTIONS
+from storage import after_commit, connection, get_pool, on_pool_close, transaction
+
+HISTORY_LIMIT = 50  # changes kept in settings_history; None disables the history
+
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS app_settings (
+        key TEXT PRIMARY KEY,
+        value
+    )''',
+    '''
+    CREATE TABLE IF NOT EXISTS settings_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        key TEXT,
+        value,
+        changed_at TEXT
+    )''',
+]
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Every setting any app variant uses; each variant reads the fields it needs."""
+    trash_type: str = 'None'
+    font: str = 'Arial'
+    font_size: int = 40
+    bg_color: str = '#FFFFFF'
+    text_color: str = '#000000'
+    pocket_money: float = 50.0
+    trash_week: float = 0.0
+    trash_month: float = 0.0
+    period: str = 'Month'
+
+
+FIELD_TYPES = {f.name: type(f.default) for f in fields(Settings)}
+TYPE_NAMES = {int: 'an integer', float: 'a number', str: 'a string'}
+# What the variants' widgets can show; anything else would break them on the next rerun.
+CHOICES = {'trash_type': TRASH_OPTIONS, 'font': FONTS, 'period': PERIODS}
+RANGES = {'font_size': (20, 60)}
+COLOR = re.compile(r'#[0-9A-Fa-f]{6}')
+COLORS = ('bg_color', 'text_color')
+
+# Stored values per database file with the data version they were loaded at;
+# any commit to the file, from this process or another, makes them stale.
+_stored = {}
+_lock = threading.Lock()
+# a closed household pool may not come back; its settings are reloaded if it does
+on_pool_close(lambda path: _stored.pop(path, None))
+
+
+def _coerce(key, value):
+    if key not in FIELD_TYPES:
+        raise KeyError(f'unknown setting {key!r}')
+    try:
+        return FIELD_TYPES[key](value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{key} must be {TYPE_NAMES[FIELD_TYPES[key]]}') from None
+
+
+def _validate(key, value):
+    """``value`` coerced for ``key``; ValueError unless the app variants can show it."""
+    coerced = _coerce(key, value)
+    if isinstance(value, bool) or (FIELD_TYPES[key] is str and not isinstance(value, str)):
+        raise ValueError(f'{key} must be {TYPE_NAMES[FIELD_TYPES[key]]}')
+    value = coerced
+    if key in CHOICES and value not in CHOICES[key]:
+        raise ValueError(f'{key} must be one of {", ".join(map(repr, CHOICES[key]))}')
+    if key in RANGES and not RANGES[key][0] <= value <= RANGES[key][1]:
+        raise ValueError(f'{key} must be between {RANGES[key][0]} and {RANGES[key][1]}')
+    if key in COLORS and not COLOR.fullmatch(value):
+        raise ValueError(f'{key} must be a color like #FFFFFF')
+    return value
+
+
+def import_legacy(conn):
+    """Copy the newest row of the old append-only settings table, whatever its columns."""
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='settings'").fetchone():
+        return {}
+    columns = [row[1] for row in conn.execute('PRAGMA table_info(settings)') if row[1] in FIELD_TYPES]
+    if not columns:
+        return {}
+    row = conn.execute(f'SELECT {", ".join(columns)} FROM settings ORDER BY id DESC LIMIT 1').fetchone()
+    if row is None:
+        return {}
+    values = {key: _coerce(key, value) for key, value in zip(columns, row) if value is not None}
+    conn.executemany('INSERT OR IGNORE INTO app_settings (key, value) VALUES (?, ?)', values.items())
+    return values
+
+
+def _load():
+    with connection() as conn:
+        return {key: _coerce(key, value) for key, value in conn.execute('SELECT key, value FROM app_settings')
+                if key in FIELD_TYPES}
+
+
+def _stored_for_current_db():
+    pool = get_pool()
+    version = pool.current_version()
+    entry = _stored.get(pool.path)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    stored = _load()
+
+    def publish():
+        with _lock:
+            _stored[pool.path] = (version, stored)
+
+    # loaded inside a caller's transaction, the table may yet be rolled back;
+    # if it commits a change instead, the version moves on and this is reloaded
+    after_commit(publish)
+    return stored
+
+
+def get_settings(**defaults):
+    """Current settings; ``defaults`` override the class defaults for keys never saved."""
+    values = {key: _coerce(key, value) for key, value in defaults.items()}
+    values.update(_stored_for_current_db())
+    return Settings(**values)
+
+
+def update_settings(**changes):
+    """Upsert the given settings, recording each actual change in the capped history.
+
+    Only the values that change are validated: one a legacy database holds
+    (a font the app no longer offers) can be passed back unchanged. What is
+    changed is decided under the write lock, against what is in the file
+    then, so a write from another process in between is not lost.
+    """
+    coerced = {key: _coerce(key, value) for key, value in changes.items()}
+    now = datetime.datetime.now().isoformat(timespec='seconds')
+    with transaction() as conn:
+        stored = _load()
+        changed = {key: _validate(key, changes[key]) for key, value in coerced.items() if stored.get(key) != value}
+        if not changed:
+            return
+        conn.executemany('INSERT INTO app_settings (key, value) VALUES (?, ?) '
+                         'ON CONFLICT(key) DO UPDATE SET value=excluded.value', changed.items())
+        if HISTORY_LIMIT:
+            conn.executemany('INSERT INTO settings_history (key, value, changed_at) VALUES (?, ?, ?)',
+                             [(key, value, now) for key, value in changed.items()])
+            conn.execute('DELETE FROM settings_history WHERE id <= (SELECT MAX(id) FROM settings_history) - ?',
+                         (HISTORY_LIMIT,))
+
+
+def get_settings_history(limit=HISTORY_LIMIT):
+    """Most recent setting changes first, as (key, value, changed_at)."""
+    with connection() as conn:
+        return conn.execute('SELECT key, value, changed_at FROM settings_history ORDER BY id DESC LIMIT ?',
+                            (limit or 0,)).fetchall()
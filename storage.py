@@ -0,0 +1,1036 @@
+import hashlib
+import math
+import os
+import re
+import sqlite3
+import sys
+import threading
+import queue
+import random
+import time
+import datetime
+import itertools
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from cache import VersionedCache
+import metrics
+
+# --- Configuration ---
+DB_PATH = 'pocket_money.db'
+POOL_SIZE = 8            # max connections open at once per database file
+BUSY_TIMEOUT_MS = 5000   # how long SQLite itself waits on a locked database
+LOCK_RETRIES = 5         # extra attempts (with backoff) after busy_timeout expires
+BACKOFF_BASE = 0.05      # seconds, doubled on every retry
+PAGE_SIZE = 20
+DEFAULT_CATEGORY = 'Other'  # for rows from layouts and files without a category
+DEFAULT_PERIOD = 'Month'
+
+# --- Households: one database file each ---
+TENANT_DIR = 'households'
+TENANT_POOL_SIZE = 2         # a household is one or two sessions at a time
+MAX_OPEN_TENANTS = 64        # least recently used households beyond this are closed
+TENANT_IDLE_SECONDS = 300    # households unused for this long are closed
+TENANT_ID = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS expenses (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        category TEXT,
+        amount REAL,
+        period TEXT,
+        date TEXT
+    )''',
+    '''
+    CREATE TABLE IF NOT EXISTS eid_money (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        giver TEXT,
+        amount REAL,
+        date TEXT
+    )''',
+    '''
+    CREATE TABLE IF NOT EXISTS rewards (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        type TEXT,
+        amount REAL,
+        date TEXT
+    )''',
+    '''
+    CREATE TABLE IF NOT EXISTS transactions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        type TEXT,
+        amount REAL,
+        note TEXT,
+        date TEXT
+    )''',
+    # Running totals kept in step with the base tables by the writers below:
+    # one row per expense period ('expenses/<period>') and one for Eid money ('eid').
+    # label is no longer written; the givers are in eid_givers.
+    '''
+    CREATE TABLE IF NOT EXISTS aggregates (
+        name TEXT PRIMARY KEY,
+        amount REAL NOT NULL DEFAULT 0,
+        count INTEGER NOT NULL DEFAULT 0,
+        label TEXT NOT NULL DEFAULT ''
+    )''',
+    # Expense count and sum per calendar month ('YYYY-MM') and category, kept
+    # in step by the ROLLUP_TRIGGERS below whoever writes to expenses.
+    '''
+    CREATE TABLE IF NOT EXISTS monthly_rollup (
+        month TEXT NOT NULL,
+        category TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        amount REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (month, category)
+    ) WITHOUT ROWID''',
+    # Gifts per giver, kept in step by the GIVER_TRIGGERS below.
+    '''
+    CREATE TABLE IF NOT EXISTS eid_givers (
+        giver TEXT PRIMARY KEY,
+        count INTEGER NOT NULL DEFAULT 0,
+        amount REAL NOT NULL DEFAULT 0,
+        last_date TEXT
+    ) WITHOUT ROWID''',
+]
+EID_AGGREGATE = 'eid'
+
+# Undated or uncategorized rows roll up under ''.
+_ROLLUP_ADD = '''
+        INSERT INTO monthly_rollup (month, category, count, amount)
+        VALUES (ifnull(substr(NEW.date, 1, 7), ''), ifnull(NEW.category, ''), 1, ifnull(NEW.amount, 0))
+        ON CONFLICT (month, category) DO UPDATE SET count=count+1, amount=amount+excluded.amount;'''
+_ROLLUP_SUBTRACT = '''
+        UPDATE monthly_rollup SET count=count-1, amount=amount-ifnull(OLD.amount, 0)
+        WHERE month=ifnull(substr(OLD.date, 1, 7), '') AND category=ifnull(OLD.category, '');
+        DELETE FROM monthly_rollup
+        WHERE month=ifnull(substr(OLD.date, 1, 7), '') AND category=ifnull(OLD.category, '') AND count<=0;'''
+ROLLUP_TRIGGERS = [
+    f'CREATE TRIGGER IF NOT EXISTS expenses_rollup_insert AFTER INSERT ON expenses BEGIN{_ROLLUP_ADD}\n    END',
+    f'CREATE TRIGGER IF NOT EXISTS expenses_rollup_delete AFTER DELETE ON expenses BEGIN{_ROLLUP_SUBTRACT}\n    END',
+    f'CREATE TRIGGER IF NOT EXISTS expenses_rollup_update AFTER UPDATE OF date, category, amount ON expenses '
+    f'BEGIN{_ROLLUP_SUBTRACT}{_ROLLUP_ADD}\n    END',
+]
+_GIVER_ADD = '''
+        INSERT INTO eid_givers (giver, count, amount, last_date)
+        VALUES (ifnull(NEW.giver, ''), 1, ifnull(NEW.amount, 0), NEW.date)
+        ON CONFLICT (giver) DO UPDATE SET count=count+1, amount=amount+excluded.amount,
+            last_date=CASE WHEN excluded.last_date > ifnull(last_date, '') THEN excluded.last_date
+                           ELSE last_date END;'''
+# a removed gift may have been the giver's latest, so last_date is looked up again (eid_money_giver_date)
+_GIVER_SUBTRACT = '''
+        UPDATE eid_givers SET count=count-1, amount=amount-ifnull(OLD.amount, 0),
+            last_date=(SELECT MAX(date) FROM eid_money WHERE giver IS OLD.giver)
+        WHERE giver=ifnull(OLD.giver, '');
+        DELETE FROM eid_givers WHERE giver=ifnull(OLD.giver, '') AND count<=0;'''
+GIVER_TRIGGERS = [
+    f'CREATE TRIGGER IF NOT EXISTS eid_givers_insert AFTER INSERT ON eid_money BEGIN{_GIVER_ADD}\n    END',
+    f'CREATE TRIGGER IF NOT EXISTS eid_givers_delete AFTER DELETE ON eid_money BEGIN{_GIVER_SUBTRACT}\n    END',
+    'CREATE TRIGGER IF NOT EXISTS eid_givers_update AFTER UPDATE OF giver, amount, date ON eid_money '
+    f'BEGIN{_GIVER_SUBTRACT}{_GIVER_ADD}\n    END',
+]
+GIVERS_FROM_BASE_SQL = ("SELECT ifnull(giver, ''), COUNT(*), ifnull(SUM(amount), 0), MAX(date) "
+                        "FROM eid_money GROUP BY 1")
+ROLLUP_FROM_BASE_SQL = ('''SELECT ifnull(substr(date, 1, 7), ''), ifnull(category, ''), COUNT(*), '''
+                        '''ifnull(SUM(amount), 0) FROM expenses GROUP BY 1, 2''')
+
+# (period, id, amount) serves the newest-first list for a period and covers
+# SUM(amount) per period without touching the table; date serves range scans.
+INDEXES = [
+    'CREATE INDEX IF NOT EXISTS expenses_period_id ON expenses (period, id, amount)',
+    'CREATE INDEX IF NOT EXISTS expenses_date ON expenses (date)',
+]
+# Top givers by total; per-giver last dates and per-year totals of Eid money.
+GIVER_INDEXES = [
+    'CREATE INDEX IF NOT EXISTS eid_givers_amount ON eid_givers (amount DESC, giver)',
+    'CREATE INDEX IF NOT EXISTS eid_money_giver_date ON eid_money (giver, date)',
+    "CREATE INDEX IF NOT EXISTS eid_money_year ON eid_money (ifnull(substr(date, 1, 4), ''), amount)",
+]
+
+EXPENSE_COLUMNS = 'id, name, category, amount, period, date'  # the fields of Expense
+LIST_EXPENSES_SQL = f'SELECT {EXPENSE_COLUMNS} FROM expenses WHERE period=? ORDER BY id DESC'
+# Keyset pagination: each page starts strictly below the last id of the previous one.
+PAGE_EXPENSES_SQL = f'SELECT {EXPENSE_COLUMNS} FROM expenses WHERE period=? AND id<? ORDER BY id DESC LIMIT ?'
+PERIOD_TOTALS_SQL = 'SELECT period, SUM(amount), COUNT(*) FROM expenses GROUP BY period'
+EXPENSES_BETWEEN_SQL = f'SELECT {EXPENSE_COLUMNS} FROM expenses WHERE date BETWEEN ? AND ? ORDER BY date'
+ALL_EXPENSES_SQL = f'SELECT {EXPENSE_COLUMNS} FROM expenses ORDER BY id DESC'
+EID_MONEY_SQL = 'SELECT id, giver, amount, date FROM eid_money ORDER BY id'
+REWARDS_SQL = 'SELECT id, type, amount, date FROM rewards ORDER BY id'
+TRANSACTIONS_SQL = 'SELECT id, type, amount, note, date FROM transactions ORDER BY date DESC'
+INSERT_EXPENSE_SQL = 'INSERT INTO expenses (name, category, amount, period, date) VALUES (?, ?, ?, ?, ?)'
+INSERT_EID_SQL = 'INSERT INTO eid_money (giver, amount, date) VALUES (?, ?, ?)'
+# An aggregate row is created on first use, then bumped.
+AGGREGATE_SEED_SQL = 'INSERT OR IGNORE INTO aggregates (name) VALUES (?)'
+AGGREGATE_BUMP_SQL = 'UPDATE aggregates SET amount=amount+?, count=count+? WHERE name=?'
+AGGREGATE_SQL = 'SELECT amount, label FROM aggregates WHERE name=?'
+TOP_GIVERS_SQL = 'SELECT giver, count, amount, last_date FROM eid_givers ORDER BY amount DESC, giver LIMIT ?'
+# Keyset pagination by name; the first page (no previous giver) starts at '', the anonymous giver.
+GIVERS_PAGE_SQL = ('SELECT giver, count, amount, last_date FROM eid_givers WHERE giver>=? AND giver IS NOT ? '
+                   'ORDER BY giver LIMIT ?')
+EID_BY_YEAR_SQL = "SELECT ifnull(substr(date, 1, 4), ''), COUNT(*), SUM(amount) FROM eid_money GROUP BY 1 ORDER BY 1"
+SUMMARY_GIVERS = 3      # names in the header line of get_total_eid()...
+SUMMARY_MAX_CHARS = 40  # ...within this many characters
+
+# Index each query must be planned with; checked by assert_query_plans().
+QUERY_PLANS = [
+    (LIST_EXPENSES_SQL, ('Week',), 'expenses_period_id'),
+    (PAGE_EXPENSES_SQL, ('Week', 1000, 20), 'expenses_period_id'),
+    (PERIOD_TOTALS_SQL, (), 'expenses_period_id'),
+    (EXPENSES_BETWEEN_SQL, ('2024-01-01', '2024-12-31'), 'expenses_date'),
+    (TOP_GIVERS_SQL, (5,), 'eid_givers_amount'),
+    (EID_BY_YEAR_SQL, (), 'eid_money_year'),
+]
+
+
+def _is_locked(error):
+    message = str(error).lower()
+    return 'locked' in message or 'busy' in message
+
+
+def with_backoff(fn, retries=LOCK_RETRIES):
+    """Call fn(), retrying with jittered exponential backoff while the database is locked."""
+    for attempt in range(retries + 1):
+        try:
+            return fn()
+        except sqlite3.OperationalError as error:
+            if not _is_locked(error) or attempt == retries:
+                raise
+            time.sleep(BACKOFF_BASE * (2 ** attempt) * (0.5 + random.random()))
+
+
+# --- Schema ---
+def init_schema(conn):
+    """Bring the database to the current schema version; a no-op once it is there."""
+    from migrations import migrate  # the migrations are built from this module's schema
+    migrate(conn)
+
+
+# --- Connection pool ---
+# Data versions are drawn from one process-wide counter, so a pool reopened on
+# the same file never repeats a version a closed one cached reads under.
+_versions = itertools.count(1)
+
+
+class ConnectionPool:
+    """A bounded pool of SQLite connections handed out one per thread.
+
+    A thread keeps the same connection for as long as it holds it, so nested
+    ``connection()``/``transaction()`` blocks reuse it instead of taking a second
+    slot. When the pool is exhausted, callers wait for a slot to free up.
+    """
+
+    def __init__(self, path=DB_PATH, size=POOL_SIZE, busy_timeout=BUSY_TIMEOUT_MS, init=None):
+        self.path = path
+        self.size = size
+        self.busy_timeout = busy_timeout
+        self.init = init if init is not None else init_schema
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = queue.LifoQueue()
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._ready = False
+        self._all = []
+        self._version_lock = threading.Lock()
+        self.version = next(_versions)  # renewed after every committed transaction that changed rows
+        self._data_versions = {}  # connection -> PRAGMA data_version it last reported
+        self.in_use = 0   # connections checked out right now
+        self.last_used = time.monotonic()
+        self._use_lock = threading.Lock()
+
+    def _connect(self):
+        # isolation_level=None: transactions are opened explicitly with BEGIN IMMEDIATE
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout / 1000,
+                               isolation_level=None, check_same_thread=False,
+                               factory=metrics.connection_factory())
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout)}')
+        with_backoff(lambda: conn.execute('PRAGMA journal_mode=WAL'))
+        conn.execute('PRAGMA synchronous=NORMAL')
+        self._all.append(conn)
+        return conn
+
+    def _ensure_schema(self, conn):
+        if self._ready:
+            return
+        with self._init_lock:
+            if self._ready:
+                return
+            self.init(conn)  # runs its own transaction, if it needs one
+            self._ready = True
+
+    @contextmanager
+    def connection(self):
+        local = self._local
+        conn = getattr(local, 'conn', None)
+        if conn is not None:
+            yield conn
+            return
+
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            self._ensure_schema(conn)
+        except BaseException:
+            self._slots.release()
+            raise
+
+        local.conn = conn
+        with self._use_lock:
+            self.in_use += 1
+        try:
+            yield conn
+        finally:
+            with self._use_lock:
+                self.in_use -= 1
+                self.last_used = time.monotonic()
+            local.conn = None
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            self._idle.put(conn)
+            self._slots.release()
+
+    @contextmanager
+    def transaction(self):
+        """Run the block as one write transaction (a unit of work).
+
+        Nested blocks and every writer called inside join the outermost one,
+        so the whole block shares a single commit and is applied all or nothing.
+        """
+        with self.connection() as conn:
+            if conn.in_transaction:
+                yield conn
+                return
+            with_backoff(lambda: conn.execute('BEGIN IMMEDIATE'))
+            changes = conn.total_changes
+            self._local.after_commit = []
+            try:
+                yield conn
+                with_backoff(lambda: conn.execute('COMMIT'))
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                raise
+            finally:
+                callbacks, self._local.after_commit = self._local.after_commit, None
+            if conn.total_changes != changes:
+                self.mark_changed()
+            for callback in callbacks:
+                callback()
+
+    def mark_changed(self):
+        """Renew the data version; for commits made outside ``transaction()``, such as the async API."""
+        with self._version_lock:
+            self.version = next(_versions)
+
+    def current_version(self):
+        """The data version, renewed first if another connection committed since this one last looked.
+
+        ``version`` only counts this process's writes; PRAGMA data_version
+        also moves when another process commits (the importer CLI, a
+        standalone API, a second server worker). A connection's first look
+        renews the version too, as it can't tell what it missed.
+        """
+        with self.connection() as conn:
+            seen = conn.execute('PRAGMA data_version').fetchone()[0]
+            if self._data_versions.get(conn) != seen:
+                self._data_versions[conn] = seen
+                self.mark_changed()
+            return self.version
+
+    def after_commit(self, callback):
+        """Run ``callback`` once this thread's open transaction commits (now if none is open)."""
+        pending = getattr(self._local, 'after_commit', None)
+        if pending is None:
+            callback()
+        else:
+            pending.append(callback)
+
+    def close(self):
+        for conn in self._all:
+            conn.close()
+        self._all = []
+        self._idle = queue.LifoQueue()
+        self._data_versions = {}
+        self._ready = False
+        for callback in _close_callbacks:
+            callback(self.path)
+
+
+_close_callbacks = []
+
+
+def on_pool_close(callback):
+    """Call ``callback(path)`` whenever a pool closes, to drop per-database state kept elsewhere."""
+    _close_callbacks.append(callback)
+
+
+class TenantPools:
+    """One small pool per household database, with at most ``max_open`` open at a time.
+
+    Pools are kept in least-recently-used order. Fetching one also closes
+    pools idle for longer than ``idle_seconds`` and, past ``max_open``, the
+    least recently used ones; a pool with a connection checked out is never
+    closed. A closed household simply reopens on its next request.
+    """
+
+    def __init__(self, directory=TENANT_DIR, max_open=MAX_OPEN_TENANTS, idle_seconds=TENANT_IDLE_SECONDS,
+                 size=TENANT_POOL_SIZE):
+        self.directory = directory
+        self.max_open = max_open
+        self.idle_seconds = idle_seconds
+        self.size = size
+        self.evicted = 0
+        self._pools = OrderedDict()  # tenant -> ConnectionPool, least recently used first
+        self._lock = threading.Lock()
+
+    def path(self, tenant):
+        if not TENANT_ID.fullmatch(tenant):
+            raise ValueError(f'invalid household id {tenant!r}')
+        return os.path.join(self.directory, f'{tenant}.db')
+
+    def get(self, tenant):
+        with self._lock:
+            pool = self._pools.get(tenant)
+            if pool is None:
+                os.makedirs(self.directory, exist_ok=True)
+                pool = self._pools[tenant] = ConnectionPool(self.path(tenant), size=self.size)
+            else:
+                self._pools.move_to_end(tenant)
+            pool.last_used = time.monotonic()
+            evicted = self._evict()
+        for old in evicted:
+            old.close()  # outside the lock: closing checkpoints the WAL, other households needn't wait
+        return pool
+
+    def _evict(self):
+        """Unlink the pools to close; the caller holds the lock."""
+        deadline = time.monotonic() - self.idle_seconds
+        evicted = []
+        for tenant, pool in list(self._pools.items())[:-1]:  # never the one being handed out
+            over = len(self._pools) > self.max_open
+            if not over and pool.last_used > deadline:
+                break  # the rest were used more recently still
+            if pool.in_use:
+                continue
+            del self._pools[tenant]
+            evicted.append(pool)
+        self.evicted += len(evicted)
+        return evicted
+
+    def close(self):
+        with self._lock:
+            for pool in self._pools.values():
+                pool.close()
+            self._pools.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'open': len(self._pools), 'evicted': self.evicted,
+                    'connections': sum(len(pool._all) for pool in self._pools.values())}
+
+
+_pool = None
+_pool_lock = threading.Lock()
+tenants = TenantPools()
+_tenant = ContextVar('tenant', default=None)
+
+
+def session_household():
+    """Household of the user signed in to the Streamlit session on this thread, or None.
+
+    It comes from st.user, the identity Streamlit's login checked, never
+    from the URL or anything else the browser can set, so editing the
+    address can't open another household. Without login everyone shares the
+    default database. Streamlit is only looked at if the process loaded it,
+    so every app that imports this module routes its sessions.
+    """
+    st = sys.modules.get('streamlit')
+    if st is None:
+        return None
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    if get_script_run_ctx(suppress_warning=True) is None:
+        return None  # not a script run (CLI, API, tests): use the default database
+    user = st.user
+    if not user.get('is_logged_in'):
+        return None
+    subject = user.get('sub') or user.get('email')
+    if not subject:
+        return None
+    # a valid household id, the same for every session of the user
+    return hashlib.sha256(f'{user.get("iss", "")}\n{subject}'.encode()).hexdigest()[:32]
+
+
+_tenant_resolver = session_household
+
+
+def set_tenant_resolver(resolver):
+    """``resolver()`` names the household of the running session, or returns None."""
+    global _tenant_resolver
+    _tenant_resolver = resolver
+
+
+@contextmanager
+def use_tenant(tenant):
+    """Route the data functions called inside the block to ``tenant``'s database."""
+    tenants.path(tenant)  # validate before anything is routed
+    token = _tenant.set(tenant)
+    try:
+        yield
+    finally:
+        _tenant.reset(token)
+
+
+def current_tenant():
+    tenant = _tenant.get()
+    if tenant is None and _tenant_resolver is not None:
+        tenant = _tenant_resolver()
+    return tenant
+
+
+def configure_tenants(directory=TENANT_DIR, **options):
+    """Serve households from ``directory`` (load tests, deployments); closes the current ones."""
+    global tenants
+    tenants.close()
+    tenants = TenantPools(directory, **options)
+    return tenants
+
+
+def get_pool():
+    """The pool of the current household, or of DB_PATH when there is none."""
+    tenant = current_tenant()
+    if tenant is not None:
+        return tenants.get(tenant)
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_PATH)
+    return _pool
+
+
+def configure(path=DB_PATH, size=POOL_SIZE):
+    """Point the module-level API at another database file (benchmarks, tools)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        _pool = ConnectionPool(path, size=size)
+    return _pool
+
+
+def connection():
+    return get_pool().connection()
+
+
+def transaction():
+    return get_pool().transaction()
+
+
+def after_commit(callback):
+    get_pool().after_commit(callback)
+
+
+# --- Read cache ---
+read_cache = VersionedCache()
+
+
+def cached_read(fn):
+    """Memoize a reader on its arguments until the next committed write to its database, from any process."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        pool = get_pool()
+        key = (pool.path, fn.__module__, fn.__qualname__, args, tuple(sorted(kwargs.items())))
+        with pool.connection():  # the version checks and the read share one connection
+            return read_cache.get(key, pool.current_version, lambda: fn(*args, **kwargs))
+    return wrapper
+
+
+def cache_stats():
+    return read_cache.stats()
+
+
+on_pool_close(lambda path: read_cache.discard(lambda key: key[0] == path))
+
+
+# --- Rows ---
+STREAM_CHUNK = 1000  # rows fetched at a time by the streaming readers
+
+
+class _Row:
+    """Base of the row classes: fields in ``__slots__``, so a row is smaller than the tuple it replaces.
+
+    Rows unpack (``for id, name, *_ in expenses``) and compare like tuples.
+    from_row() takes ``share``, which maps a value to the copy of it already
+    seen by the same reader: categories, periods, types and dates repeat, and
+    a million rows then hold a few thousand strings instead of millions.
+    """
+    __slots__ = ()
+
+    def __iter__(self):
+        return (getattr(self, field) for field in self.__slots__)
+
+    def __eq__(self, other):
+        return type(other) is type(self) and tuple(self) == tuple(other)
+
+    __hash__ = None  # mutable, like the lists they come in
+
+    def __repr__(self):
+        fields = ', '.join(f'{field}={getattr(self, field)!r}' for field in self.__slots__)
+        return f'{type(self).__name__}({fields})'
+
+
+class Expense(_Row):
+    __slots__ = ('id', 'name', 'category', 'amount', 'period', 'date')
+
+    def __init__(self, id, name, category, amount, period, date):
+        self.id, self.name, self.category, self.amount, self.period, self.date = (
+            id, name, category, amount, period, date)
+
+    @classmethod
+    def from_row(cls, row, share):
+        id, name, category, amount, period, date = row
+        return cls(id, name, share(category, category), amount, share(period, period), share(date, date))
+
+
+class EidGift(_Row):
+    __slots__ = ('id', 'giver', 'amount', 'date')
+
+    def __init__(self, id, giver, amount, date):
+        self.id, self.giver, self.amount, self.date = id, giver, amount, date
+
+    @classmethod
+    def from_row(cls, row, share):
+        id, giver, amount, date = row
+        return cls(id, share(giver, giver), amount, share(date, date))
+
+
+class Reward(_Row):
+    __slots__ = ('id', 'type', 'amount', 'date')
+
+    def __init__(self, id, type, amount, date):
+        self.id, self.type, self.amount, self.date = id, type, amount, date
+
+    @classmethod
+    def from_row(cls, row, share):
+        id, type, amount, date = row
+        return cls(id, share(type, type), amount, share(date, date))
+
+
+class Transaction(_Row):
+    __slots__ = ('id', 'type', 'amount', 'note', 'date')
+
+    def __init__(self, id, type, amount, note, date):
+        self.id, self.type, self.amount, self.note, self.date = id, type, amount, note, date
+
+    @classmethod
+    def from_row(cls, row, share):
+        id, type, amount, note, date = row
+        return cls(id, share(type, type), amount, note, share(date, date))
+
+
+def stream(cls, sql, params=(), chunk_size=STREAM_CHUNK):
+    """Yield the rows of ``sql`` as ``cls`` instances, fetched ``chunk_size`` at a time.
+
+    The query reads one snapshot, held until the generator is exhausted or
+    closed; don't write from the same thread while iterating.
+    """
+    share, make = {}.setdefault, cls.from_row
+    with connection() as conn:
+        cursor = conn.execute(sql, params)
+        try:
+            while rows := cursor.fetchmany(chunk_size):
+                for row in rows:
+                    yield make(row, share)
+        finally:
+            cursor.close()
+
+
+# --- Aggregates ---
+def expense_aggregate(period):
+    return f'expenses/{period}'
+
+
+def _bump_aggregate(conn, name, amount, count):
+    conn.execute(AGGREGATE_SEED_SQL, (name,))
+    conn.execute(AGGREGATE_BUMP_SQL, (amount, count, name))
+
+
+def _aggregates_from_base(conn):
+    """Recompute every aggregate row from expenses and eid_money."""
+    expected = {}
+    for period, amount, count in conn.execute(PERIOD_TOTALS_SQL):
+        expected[expense_aggregate(period)] = (amount or 0, count, '')
+    amount, count = conn.execute('SELECT SUM(amount), COUNT(*) FROM eid_money').fetchone()
+    expected[EID_AGGREGATE] = (amount or 0, count, '')
+    return expected
+
+
+def rebuild_aggregates(conn):
+    conn.execute('DELETE FROM aggregates')
+    conn.executemany('INSERT INTO aggregates (name, amount, count, label) VALUES (?, ?, ?, ?)',
+                     [(name,) + values for name, values in _aggregates_from_base(conn).items()])
+
+
+def check_aggregates(repair=False):
+    """Compare the stored aggregates with a fresh rebuild from the base tables.
+
+    Returns a list of ``(name, stored, expected)`` tuples for every row that
+    drifted, where each value is ``(amount, count, label)`` or None if missing.
+    With ``repair=True`` the aggregates are rebuilt in the same transaction.
+    """
+    with transaction() as conn:
+        stored = {row[0]: tuple(row[1:]) for row in conn.execute('SELECT name, amount, count, label FROM aggregates')}
+        expected = _aggregates_from_base(conn)
+        drift = []
+        for name in sorted(set(stored) | set(expected)):
+            have = stored.get(name)
+            want = expected.get(name)
+            if have is not None and want is not None:
+                if math.isclose(have[0], want[0], rel_tol=1e-9, abs_tol=1e-6) and have[1:] == want[1:]:
+                    continue
+            elif (have or want)[1] == 0:
+                continue  # an empty period with or without a row is the same total
+            drift.append((name, have, want))
+        if drift and repair:
+            rebuild_aggregates(conn)
+    return drift
+
+
+# --- Monthly rollup ---
+def rebuild_rollup(conn):
+    """Recompute monthly_rollup from expenses, e.g. after writes made with the triggers missing."""
+    conn.execute('DELETE FROM monthly_rollup')
+    conn.execute(f'INSERT INTO monthly_rollup (month, category, count, amount) {ROLLUP_FROM_BASE_SQL}')
+
+
+def rebuild_givers(conn):
+    """Recompute eid_givers from eid_money, like rebuild_rollup()."""
+    conn.execute('DELETE FROM eid_givers')
+    conn.execute(f'INSERT INTO eid_givers (giver, count, amount, last_date) {GIVERS_FROM_BASE_SQL}')
+
+
+def check_rollup(repair=False):
+    """Like check_aggregates(), for monthly_rollup: ``(month, category, stored, expected)`` per drifted row."""
+    with transaction() as conn:
+        stored = {row[:2]: row[2:] for row in
+                  conn.execute('SELECT month, category, count, amount FROM monthly_rollup')}
+        expected = {row[:2]: row[2:] for row in conn.execute(ROLLUP_FROM_BASE_SQL)}
+        drift = []
+        for key in sorted(set(stored) | set(expected)):
+            have, want = stored.get(key), expected.get(key)
+            if have and want and have[0] == want[0] and math.isclose(have[1], want[1], rel_tol=1e-9, abs_tol=1e-6):
+                continue
+            drift.append((*key, have, want))
+        if drift and repair:
+            rebuild_rollup(conn)
+    return drift
+
+
+@cached_read
+def get_monthly_rollup(year=None):
+    """(month, category, count, amount) rows, oldest month first; only ``year``'s months if given."""
+    with connection() as conn:
+        if year is None:
+            return conn.execute('SELECT month, category, count, amount FROM monthly_rollup '
+                                'ORDER BY month, category').fetchall()
+        return conn.execute('SELECT month, category, count, amount FROM monthly_rollup '
+                            'WHERE month BETWEEN ? AND ? ORDER BY month, category',
+                            (f'{year}-01', f'{year}-12')).fetchall()
+
+
+@cached_read
+def get_yearly_rollup():
+    """(year, category, count, amount) rows summed from the monthly rollup, oldest year first."""
+    with connection() as conn:
+        return conn.execute('SELECT substr(month, 1, 4), category, SUM(count), SUM(amount) FROM monthly_rollup '
+                            'GROUP BY 1, 2 ORDER BY 1, 2').fetchall()
+
+
+# --- Query plans ---
+def explain(conn, sql, params=()):
+    return [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params)]
+
+
+def assert_query_plans():
+    """Raise AssertionError unless every query in QUERY_PLANS uses its index and needs no sort."""
+    with connection() as conn:
+        for sql, params, index in QUERY_PLANS:
+            plan = explain(conn, sql, params)
+            detail = f'{sql!r} -> {plan}'
+            assert any(f'INDEX {index}' in step for step in plan), detail
+            assert 'SCAN expenses' not in plan, detail  # a bare full-table scan
+            assert not any('TEMP B-TREE' in step for step in plan), detail
+
+
+# --- Data functions ---
+def insert_expenses(conn, rows):
+    """executemany() (name, category, amount, period, date) rows inside an open transaction.
+
+    The aggregates are bumped once per period at the end instead of once per
+    row. Returns the number of rows inserted.
+    """
+    totals = {}
+
+    def counted():
+        for row in rows:
+            amount, count = totals.get(row[3], (0, 0))
+            totals[row[3]] = (amount + (row[2] or 0), count + 1)
+            yield row
+
+    conn.executemany(INSERT_EXPENSE_SQL, counted())
+    for period, (amount, count) in totals.items():
+        _bump_aggregate(conn, expense_aggregate(period), amount, count)
+    return sum(count for _, count in totals.values())
+
+
+def _today():
+    return datetime.date.today().isoformat()
+
+
+def _dated(rows, width):
+    """Append today's date to rows given without one."""
+    today = _today()
+    return (row if len(row) > width else (*row, today) for row in rows)
+
+
+def add_expenses_many(rows):
+    """Insert (name, category, amount, period[, date]) rows with one commit; returns the count."""
+    with transaction() as conn:
+        return insert_expenses(conn, _dated(rows, 4))
+
+
+def add_expense(name, category, amount, period):
+    add_expenses_many([(name, category, amount, period)])
+
+
+def remove_expenses_many(expense_ids, chunk_size=500):
+    """Delete expenses by id with one commit; returns how many existed."""
+    expense_ids = list(expense_ids)
+    removed = 0
+    with transaction() as conn:
+        for start in range(0, len(expense_ids), chunk_size):
+            chunk = expense_ids[start:start + chunk_size]
+            marks = ', '.join('?' * len(chunk))
+            totals = conn.execute(f'SELECT period, SUM(amount), COUNT(*) FROM expenses WHERE id IN ({marks}) '
+                                  'GROUP BY period', chunk).fetchall()
+            conn.execute(f'DELETE FROM expenses WHERE id IN ({marks})', chunk)
+            for period, amount, count in totals:
+                _bump_aggregate(conn, expense_aggregate(period), -(amount or 0), -count)
+                removed += count
+    return removed
+
+
+def remove_expense(expense_id):
+    remove_expenses_many([expense_id])
+
+
+@cached_read
+def get_expenses(period):
+    return list(iter_expenses(period))
+
+
+def iter_expenses(period):
+    """The expenses of a period, newest first, streamed; get_expenses() is the cached list."""
+    return stream(Expense, LIST_EXPENSES_SQL, (period,))
+
+
+@cached_read
+def get_expenses_page(period, before_id=None, limit=PAGE_SIZE):
+    """Up to ``limit`` expenses of a period, newest first, with ids below ``before_id``.
+
+    Pass the id of the last row of one page as ``before_id`` to get the next.
+    """
+    if before_id is None:
+        before_id = 2 ** 63 - 1
+    return list(stream(Expense, PAGE_EXPENSES_SQL, (period, before_id, limit)))
+
+
+@cached_read
+def get_expenses_between(start, end):
+    """Expenses dated within [start, end] (ISO date strings), oldest first."""
+    return list(stream(Expense, EXPENSES_BETWEEN_SQL, (start, end)))
+
+
+@cached_read
+def get_total_expenses(period):
+    with connection() as conn:
+        result = conn.execute('SELECT amount FROM aggregates WHERE name=?', (expense_aggregate(period),)).fetchone()
+    return result[0] if result and result[0] else 0
+
+
+@cached_read
+def get_all_expenses():
+    """Every expense, newest first, whatever its period."""
+    return list(iter_all_expenses())
+
+
+def iter_all_expenses():
+    """get_all_expenses(), streamed."""
+    return stream(Expense, ALL_EXPENSES_SQL)
+
+
+@cached_read
+def get_total_spent():
+    """Sum of every expense across all periods, from the per-period aggregates."""
+    with connection() as conn:
+        result = conn.execute("SELECT SUM(amount) FROM aggregates WHERE name LIKE 'expenses/%'").fetchone()
+    return result[0] if result and result[0] else 0
+
+
+def add_eid_money_many(rows):
+    """Insert (giver, amount[, date]) rows with one commit; returns the count."""
+    rows = list(_dated(rows, 2))
+    if not rows:
+        return 0
+    with transaction() as conn:
+        conn.executemany(INSERT_EID_SQL, rows)
+        _bump_aggregate(conn, EID_AGGREGATE, sum(row[1] or 0 for row in rows), len(rows))
+    return len(rows)
+
+
+def add_eid_money(giver, amount):
+    add_eid_money_many([(giver, amount)])
+
+
+@cached_read
+def get_total_eid():
+    """(total, summary): all Eid money and a short line naming the biggest givers."""
+    with connection() as conn:
+        result = conn.execute(AGGREGATE_SQL, (EID_AGGREGATE,)).fetchone()
+        top = conn.execute(TOP_GIVERS_SQL, (SUMMARY_GIVERS,)).fetchall()
+        givers = conn.execute('SELECT COUNT(*) FROM eid_givers').fetchone()[0]
+    if result and result[0]:
+        return result[0], giver_summary([row[0] for row in top], givers - len(top))
+    return 0, ''
+
+
+def giver_summary(names, others=0, max_chars=SUMMARY_MAX_CHARS):
+    """'a, b, c +5': ``names`` in order, then how many more, at most ``max_chars`` before the count."""
+    shown = []
+    for name in names:
+        if shown and len(', '.join(shown + [name])) > max_chars:
+            break
+        shown.append(name if len(name) <= max_chars else name[:max_chars - 1] + '…')
+    hidden = others + len(names) - len(shown)
+    return ', '.join(shown) + (f' +{hidden}' if hidden else '')
+
+
+@cached_read
+def get_top_givers(limit=5):
+    """(giver, count, total, last_date) of the ``limit`` givers who gave the most."""
+    with connection() as conn:
+        return conn.execute(TOP_GIVERS_SQL, (limit,)).fetchall()
+
+
+@cached_read
+def get_givers_page(after=None, limit=PAGE_SIZE):
+    """Up to ``limit`` (giver, count, total, last_date) rows by name, after the giver ``after``."""
+    with connection() as conn:
+        return conn.execute(GIVERS_PAGE_SQL, (after or '', after, limit)).fetchall()
+
+
+@cached_read
+def get_eid_by_year():
+    """(year, count, total) of Eid money per year of its date, oldest first; undated gifts are under ''."""
+    with connection() as conn:
+        return conn.execute(EID_BY_YEAR_SQL).fetchall()
+
+
+def add_rewards_many(rows):
+    """Insert (type, amount[, date]) rows with one commit; returns the count."""
+    with transaction() as conn:
+        before = conn.total_changes
+        conn.executemany('INSERT INTO rewards (type, amount, date) VALUES (?, ?, ?)', _dated(rows, 2))
+        return conn.total_changes - before
+
+
+def add_reward(type_name, amount):
+    add_rewards_many([(type_name, amount)])
+
+
+@cached_read
+def get_eid_money():
+    return list(iter_eid_money())
+
+
+def iter_eid_money():
+    return stream(EidGift, EID_MONEY_SQL)
+
+
+@cached_read
+def get_rewards():
+    return list(iter_rewards())
+
+
+def iter_rewards():
+    return stream(Reward, REWARDS_SQL)
+
+
+def add_transactions_many(rows):
+    """Insert (type, amount, note[, date]) rows with one commit; returns the count."""
+    with transaction() as conn:
+        before = conn.total_changes
+        conn.executemany('INSERT INTO transactions (type, amount, note, date) VALUES (?, ?, ?, ?)',
+                         _dated(rows, 3))
+        return conn.total_changes - before
+
+
+def add_transaction(t_type, amount, note):
+    add_transactions_many([(t_type, amount, note)])
+
+
+@cached_read
+def get_transactions():
+    return list(iter_transactions())
+
+
+def iter_transactions():
+    return stream(Transaction, TRANSACTIONS_SQL)
+
+
+@cached_read
+def get_total():
+    """Balance of the transactions ledger (expenses are stored negative)."""
+    with connection() as conn:
+        result = conn.execute('SELECT SUM(amount) FROM transactions').fetchone()[0]
+    return result if result else 0
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Riyal Tracker storage maintenance')
+    parser.add_argument('command', choices=['check', 'plans', 'rollup'])
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--repair', action='store_true', help='rebuild the aggregates if they drifted')
+    parser.add_argument('--rebuild', action='store_true', help='rollup: recompute it instead of checking it')
+    args = parser.parse_args()
+
+    configure(args.db)
+    if args.command == 'plans':
+        assert_query_plans()
+        print('all queries use their indexes')
+        raise SystemExit(0)
+    if args.command == 'rollup':
+        if args.rebuild:
+            with transaction() as conn:
+                rebuild_rollup(conn)
+                count = conn.execute('SELECT COUNT(*) FROM monthly_rollup').fetchone()[0]
+            print(f'monthly rollup rebuilt: {count} (month, category) rows')
+            raise SystemExit(0)
+        drift = check_rollup()
+        for month, category, have, want in drift:
+            print(f'{month} {category}: stored={have} expected={want}')
+        print(f'{len(drift)} rollup row(s) drifted')
+        raise SystemExit(1 if drift else 0)
+
+    drift = check_aggregates(repair=args.repair)
+    for name, have, want in drift:
+        print(f'{name}: stored={have} expected={want}')
+    print(f'{len(drift)} aggregate(s) drifted' + (' (repaired)' if drift and args.repair else ''))
+    raise SystemExit(1 if drift and not args.repair else 0)
@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+# The modules live side by side at the top of the repository and import each other by name.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import storage  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path):
+    """A fresh database, named like the app's own, that the data functions use for the test."""
+    pool = storage.configure(str(tmp_path / storage.DB_PATH))
+    yield pool
+    pool.close()
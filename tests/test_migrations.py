@@ -0,0 +1,65 @@
+import sqlite3
+
+import migrations
+import search
+import settings
+import storage
+
+
+def legacy_file(path, statements):
+    conn = sqlite3.connect(path)
+    with conn:
+        for sql in statements:
+            conn.execute(sql)
+    conn.close()
+
+
+def test_every_old_layout_is_migrated_once(tmp_path):
+    main = tmp_path / storage.DB_PATH
+    # app.py's expenses had no category or period; riyaltacker_full's settings one row per save
+    legacy_file(main, [
+        'CREATE TABLE expenses (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, amount REAL, date TEXT)',
+        "INSERT INTO expenses (id, name, amount, date) VALUES (7, 'tea', 3.0, '2024-05-01')",
+        "INSERT INTO expenses (id, name, amount, date) VALUES (9, 'cake', 4.5, '2024-06-02')",
+        'CREATE TABLE settings (id INTEGER PRIMARY KEY AUTOINCREMENT, trash_type TEXT, font TEXT, '
+        'bg_color TEXT, text_color TEXT)',
+        "INSERT INTO settings (trash_type, font, bg_color, text_color) VALUES ('None', 'Arial', '#FFFFFF', '#000000')",
+        "INSERT INTO settings (trash_type, font, bg_color, text_color) VALUES ('None', 'Courier', '#EEEEEE', '#111111')",
+    ])
+    legacy_file(tmp_path / 'riyaltacker.db', [
+        'CREATE TABLE expenses (id INTEGER PRIMARY KEY AUTOINCREMENT, item TEXT, amount REAL, date TEXT)',
+        "INSERT INTO expenses (item, amount, date) VALUES ('crayons', 6.0, '2023-09-01')",
+        'CREATE TABLE eid_money (id INTEGER PRIMARY KEY AUTOINCREMENT, giver TEXT, amount REAL, date TEXT)',
+        "INSERT INTO eid_money (giver, amount, date) VALUES ('Grandma', 100.0, '2024-04-10')",
+        'CREATE TABLE rewards (id INTEGER PRIMARY KEY AUTOINCREMENT, type TEXT, amount REAL, date TEXT)',
+        "INSERT INTO rewards (type, amount, date) VALUES ('trash', 10.0, '2024-04-11')",
+    ])
+    legacy_file(tmp_path / 'riyals.db', [
+        'CREATE TABLE transactions (id INTEGER PRIMARY KEY AUTOINCREMENT, type TEXT, amount REAL, note TEXT, '
+        'date TEXT)',
+        "INSERT INTO transactions (type, amount, note, date) VALUES ('expense', -2.0, 'juice', '2024-04-12')",
+    ])
+
+    conn = sqlite3.connect(main, isolation_level=None)
+    assert migrations.migrate(conn) == list(range(1, migrations.SCHEMA_VERSION + 1))
+    assert migrations.migrate(conn) == []  # a current database is left alone
+    assert migrations.schema_version(conn) == migrations.SCHEMA_VERSION
+    for table, columns in migrations.COLUMN_SOURCES.items():
+        assert migrations._columns(conn, table) == ['id', *columns]
+    rows = conn.execute('SELECT id, name, category, amount, period, date FROM expenses ORDER BY id').fetchall()
+    conn.close()
+    # the main file keeps its ids; merged rows come after them, old columns filled with the defaults
+    assert rows[:2] == [(7, 'tea', storage.DEFAULT_CATEGORY, 3.0, storage.DEFAULT_PERIOD, '2024-05-01'),
+                        (9, 'cake', storage.DEFAULT_CATEGORY, 4.5, storage.DEFAULT_PERIOD, '2024-06-02')]
+    assert rows[2][0] > 9 and rows[2][1:4] == ('crayons', storage.DEFAULT_CATEGORY, 6.0)
+
+    pool = storage.configure(str(main))
+    try:
+        assert settings.get_settings().font == 'Courier'  # the newest legacy settings row
+        assert storage.get_total_expenses(storage.DEFAULT_PERIOD) == 13.5
+        assert storage.get_total_eid()[0] == 100.0
+        assert [row.note for row in storage.get_transactions()] == ['juice']
+        assert storage.check_aggregates() == [] and storage.check_rollup() == []
+        assert [row[0] for row in search.search('expenses', 'crayons')] == [rows[2][0]]
+    finally:
+        pool.close()
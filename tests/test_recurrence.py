@@ -0,0 +1,66 @@
+import datetime
+import random
+
+import pytest
+
+from recurrence import FREQUENCIES, Rule, _month_day, occurrences, period_amount
+
+CASES = 20_000
+
+
+def pays_on(frequency, start, day):
+    """Whether a rule from ``start`` pays on ``day``, decided for that one day."""
+    if day < start:
+        return False
+    if frequency == 'daily':
+        return True
+    if frequency == 'weekly':
+        return (day - start).days % 7 == 0
+    if frequency == 'monthly':
+        return day == _month_day(day.year, day.month, start.day)
+    return day.month == start.month and day == _month_day(day.year, start.month, start.day)
+
+
+def walked(frequency, start, end, range_start, range_end):
+    """occurrences() the slow way: every day of the range, one at a time."""
+    count, day = 0, range_start
+    while day <= range_end:
+        if (end is None or day <= end) and pays_on(frequency, start, day):
+            count += 1
+        day += datetime.timedelta(days=1)
+    return count
+
+
+def random_date(rng):
+    return datetime.date(2000, 1, 1) + datetime.timedelta(days=rng.randrange(12 * 366))
+
+
+def test_occurrences_match_walking_the_days():
+    rng = random.Random(21)
+    for _ in range(CASES):
+        frequency = rng.choice(FREQUENCIES)
+        start = random_date(rng)
+        if rng.random() < 0.3:
+            start = _month_day(start.year, start.month, 31)  # month ends: the clamped cases
+        end = None if rng.random() < 0.5 else start + datetime.timedelta(days=rng.randrange(-30, 900))
+        range_start = start + datetime.timedelta(days=rng.randrange(-400, 700))
+        range_end = range_start + datetime.timedelta(days=rng.randrange(-5, 500))
+        args = (frequency, start, end, range_start, range_end)
+        assert occurrences(*args) == walked(*args), args
+
+
+def test_monthly_rule_on_the_31st_pays_on_the_last_day_of_shorter_months():
+    start = datetime.date(2024, 1, 31)
+    assert occurrences('monthly', start, None, datetime.date(2024, 2, 1), datetime.date(2024, 2, 29)) == 1
+    assert occurrences('monthly', start, None, datetime.date(2024, 2, 1), datetime.date(2024, 2, 28)) == 0
+
+
+@pytest.mark.parametrize('period, expected', [('Week', 10.0), ('Month', 50.0), ('Year', 600.0)])
+def test_period_amount(period, expected):
+    rule = Rule('pocket_money', 10.0, 'weekly') if period == 'Week' else Rule('pocket_money', 50.0, 'monthly')
+    assert period_amount([rule], period, datetime.date(2025, 6, 11)) == expected
+
+
+def test_unknown_frequency():
+    with pytest.raises(ValueError):
+        occurrences('hourly', datetime.date(2024, 1, 1), None, datetime.date(2024, 1, 1), datetime.date(2024, 1, 2))
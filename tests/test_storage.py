@@ -0,0 +1,30 @@
+import sqlite3
+
+import storage
+
+
+def test_queries_use_their_indexes(db):
+    storage.add_expenses_many([(f'item {i}', 'Food', 1.0 + i % 7, ('Week', 'Month', 'Year')[i % 3])
+                               for i in range(300)])
+    storage.add_eid_money_many([(f'giver {i % 11}', 10.0 + i) for i in range(50)])
+    storage.assert_query_plans()
+
+
+def test_aggregates_and_rollup_follow_writes(db):
+    storage.add_expenses_many([('tea', 'Food', 3.0, 'Week'), ('toy', 'Toys', 20.0, 'Month')])
+    storage.add_expense('book', 'Other', 7.5, 'Week')
+    storage.remove_expenses_many([row.id for row in storage.get_expenses('Month')])
+    assert storage.get_total_expenses('Week') == 10.5
+    assert storage.get_total_expenses('Month') == 0
+    assert storage.check_aggregates() == []
+    assert storage.check_rollup() == []
+
+
+def test_cached_reads_see_other_connections(db):
+    storage.add_expense('tea', 'Food', 3.0, 'Week')
+    assert len(storage.get_expenses('Week')) == 1
+    other = sqlite3.connect(db.path)  # as another process would write
+    with other:
+        other.execute(storage.INSERT_EXPENSE_SQL, ('cake', 'Food', 4.0, 'Week', '2025-01-01'))
+    other.close()
+    assert len(storage.get_expenses('Week')) == 2
@@ -0,0 +1,71 @@
+"""Access tokens for the JSON API, kept in each household's own database.
+
+A token opens only the database it was issued in, so it names a household
+as much as it authenticates the caller. Only its SHA-256 is stored: the
+token itself is shown once, when it is issued.
+
+    python tokens.py --household <id>     issue one and print it
+    python tokens.py --revoke             revoke every token of the database
+"""
+import datetime
+import hashlib
+import secrets
+
+from storage import connection, transaction
+
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS api_tokens (
+        token_hash TEXT PRIMARY KEY,
+        label TEXT,
+        created_at TEXT
+    ) WITHOUT ROWID''',
+]
+CHECK_TOKEN_SQL = 'SELECT 1 FROM api_tokens WHERE token_hash=?'
+
+
+def token_hash(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def issue_token(label=''):
+    """A new token for the current database; it can't be read back later."""
+    token = secrets.token_urlsafe(32)
+    now = datetime.datetime.now().isoformat(timespec='seconds')
+    with transaction() as conn:
+        conn.execute('INSERT INTO api_tokens (token_hash, label, created_at) VALUES (?, ?, ?)',
+                     (token_hash(token), label, now))
+    return token
+
+
+def check_token(token):
+    """Whether ``token`` was issued in the current database and not revoked."""
+    with connection() as conn:
+        return conn.execute(CHECK_TOKEN_SQL, (token_hash(token),)).fetchone() is not None
+
+
+def revoke_tokens():
+    """Revoke every token of the current database; returns how many there were."""
+    with transaction() as conn:
+        return conn.execute('DELETE FROM api_tokens').rowcount
+
+
+if __name__ == '__main__':
+    import argparse
+    from contextlib import nullcontext
+
+    import storage
+
+    parser = argparse.ArgumentParser(description='Issue or revoke JSON API tokens')
+    parser.add_argument('--household', help='household id (default: the --db database)')
+    parser.add_argument('--db', default=storage.DB_PATH)
+    parser.add_argument('--label', default='cli')
+    parser.add_argument('--revoke', action='store_true', help='revoke every token instead')
+    args = parser.parse_args()
+
+    storage.configure(args.db)
+    with storage.use_tenant(args.household) if args.household else nullcontext():
+        if args.revoke:
+            print(f'revoked {revoke_tokens()} tokens')
+        else:
+            print(issue_token(args.label))
@@ -0,0 +1,260 @@
+import os
+import tempfile
+from contextlib import nullcontext
+from html import escape
+
+import streamlit as st
+
+import export
+import metrics
+import search
+import storage
+import tokens
+from importer import import_csv
+from options import CATEGORIES, PERIODS
+from storage import (PAGE_SIZE, get_eid_by_year, get_expenses_page, get_givers_page, get_monthly_rollup,
+                     get_top_givers, get_yearly_rollup, remove_expenses_many)
+
+ARABIC_COLUMNS = ('الوصف', 'الفئة', 'المبلغ (﷼)', 'التاريخ')
+
+API_ENABLED = os.environ.get('RIYAL_API', '') not in ('', '0')
+if API_ENABLED:
+    import api  # aiosqlite and uvicorn are only needed when the API is on
+    api.serve()
+
+
+def expense_table(period, columns=ARABIC_COLUMNS, page_size=PAGE_SIZE, key='expenses'):
+    """Show one page of a period's expenses as a single table with a ❌ column.
+
+    Pages are fetched with keyset pagination, so only the rows on screen are
+    read and sent to the browser. Ticking ❌ on a row deletes it.
+    """
+    nav = st.session_state.get(key)
+    if nav is None or nav['period'] != period:
+        # cursors[i] is the id the i-th page starts below; None is the newest page
+        nav = st.session_state[key] = {'period': period, 'cursors': [None], 'rev': 0}
+
+    rows = get_expenses_page(period, nav['cursors'][-1], page_size + 1)
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+    if not rows and len(nav['cursors']) > 1:
+        nav['cursors'].pop()  # the last page was emptied by deletions
+        st.rerun()
+
+    name_col, category_col, amount_col, date_col = columns
+    if not rows:
+        return
+    edited = st.data_editor(
+        [{'id': r.id, name_col: r.name, category_col: r.category, amount_col: r.amount, date_col: r.date, '❌': False}
+         for r in rows],
+        column_config={'id': None, amount_col: st.column_config.NumberColumn(format='%.2f')},
+        disabled=[name_col, category_col, amount_col, date_col],
+        hide_index=True,
+        key=f'{key}_editor_{nav["rev"]}',
+    )
+    deleted = [row['id'] for row in edited if row['❌']]
+    if deleted:
+        remove_expenses_many(deleted)  # one commit however many rows were ticked
+        nav['rev'] += 1  # fresh editor state, otherwise the tick sticks to the next row
+        st.rerun()
+
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        if st.button('◀', key=f'{key}_prev', disabled=len(nav['cursors']) == 1):
+            nav['cursors'].pop()
+            st.rerun()
+    with col_page:
+        st.caption(f'{len(nav["cursors"])}')
+    with col_next:
+        if st.button('▶', key=f'{key}_next', disabled=not has_next):
+            nav['cursors'].append(rows[-1].id)
+            st.rerun()
+
+
+def import_panel(periods=PERIODS):
+    """Upload a CSV / bank statement and stream it into the expenses table."""
+    st.header('📥 استيراد مصروفات')
+    upload = st.file_uploader('ملف CSV', type=['csv'])
+    period = st.selectbox('الفترة', list(periods), index=1 if len(periods) > 1 else 0)
+    if upload is not None and st.button('استيراد'):
+        bar = st.progress(0.0)
+
+        def report(rows, fraction):
+            bar.progress(fraction if fraction is not None else 0.0, text=f'{rows} ✓')
+
+        stats = import_csv(upload, period, progress=report, total_bytes=upload.size)
+        bar.progress(1.0, text=f'{stats["imported"]} ✓')
+        st.success(f'تم استيراد {stats["imported"]} مصروف')
+        if stats['skipped']:
+            st.warning(f'تم تجاهل {stats["skipped"]} سطر')
+        if stats['credits']:
+            st.info(f'لم تُستورد {stats["credits"]} عملية إيداع')
+
+
+def export_panel(tables=tuple(export.TABLES)):
+    """Download a table as CSV or Parquet; the file is written when the button is clicked."""
+    st.header('📤 تصدير')
+    table = st.selectbox('الجدول', tables)
+    fmt = st.radio('الصيغة', export.FORMATS, horizontal=True)
+    household = storage.current_tenant()  # the download runs on another thread, outside this session
+
+    def write():
+        # streamed to disk chunk by chunk; Streamlit then serves the finished file
+        out = tempfile.TemporaryFile()
+        with storage.use_tenant(household) if household else nullcontext():
+            export.export(table, fmt, out)
+        out.seek(0)
+        return out
+
+    st.download_button('تنزيل', write, file_name=f'{table}.{fmt}', mime=export.MIME_TYPES[fmt])
+
+
+def eid_givers_panel(top=5, page_size=PAGE_SIZE, key='givers'):
+    """The biggest givers, Eid money per year, and every giver a page at a time."""
+    leaders = get_top_givers(top)
+    if not leaders:
+        return
+    money = {'المبلغ (﷼)': st.column_config.NumberColumn(format='%.2f')}
+
+    def table(rows):
+        st.dataframe([{'المعطي': giver, 'المرات': count, 'المبلغ (﷼)': amount, 'آخر عيدية': last}
+                      for giver, count, amount, last in rows], hide_index=True, column_config=money)
+
+    st.subheader('🏆 أكثر المعطين')
+    table(leaders)
+    st.subheader('حسب السنة')
+    st.dataframe([{'السنة': y, 'المرات': n, 'المبلغ (﷼)': a} for y, n, a in get_eid_by_year()],
+                 hide_index=True, column_config=money)
+
+    with st.expander('كل المعطين'):
+        # cursors[i] is the giver the i-th page starts after; None is the first page
+        cursors = st.session_state.setdefault(key, [None])
+        rows = get_givers_page(cursors[-1], page_size + 1)
+        table(rows[:page_size])
+        col_prev, col_page, col_next = st.columns([1, 2, 1])
+        with col_prev:
+            if st.button('◀', key=f'{key}_prev', disabled=len(cursors) == 1):
+                cursors.pop()
+                st.rerun()
+        with col_page:
+            st.caption(f'{len(cursors)}')
+        with col_next:
+            if st.button('▶', key=f'{key}_next', disabled=len(rows) <= page_size):
+                cursors.append(rows[page_size - 1][0])
+                st.rerun()
+
+
+def search_panel(sources=('expenses', 'transactions')):
+    """A search box over expense names and categories and transaction notes, best matches first."""
+    st.header('🔎 بحث')
+    text = st.text_input('ابحث في المصروفات والملاحظات')
+    if not text.strip():
+        return
+    titles = {'expenses': 'المصروفات', 'transactions': 'المعاملات'}
+    found = False
+    for source in sources:
+        rows = search.search(source, text)
+        if not rows:
+            continue
+        found = True
+        st.subheader(titles[source])
+        if source == 'expenses':
+            lines = [f'{search.to_html(name)} · {search.to_html(category)} · {"" if amount is None else f"{amount:.2f}"} ﷼ · '
+                     f'{escape(date or "")}' for _, name, category, amount, date in rows]
+        else:
+            lines = [f'{escape(date or "")} · {escape(kind or "")} · {"" if amount is None else f"{amount:.2f}"} ﷼ · '
+                     f'{search.to_html(note)}' for _, kind, amount, note, date in rows]
+        st.markdown('<br>'.join(lines), unsafe_allow_html=True)
+    if not found:
+        st.info('لا توجد نتائج')
+
+
+def history_panel(categories=CATEGORIES):
+    """Spending per month or per year and category, read from the monthly rollup."""
+    st.header('📊 السجل')
+    view = st.radio('العرض', ['شهري', 'سنوي'], horizontal=True)
+    if view == 'شهري':
+        years = sorted({row[0] for row in get_yearly_rollup()}, reverse=True)
+        if not years:
+            st.info('لا توجد مصروفات بعد')
+            return
+        year = st.selectbox('السنة', years)
+        rows, label = get_monthly_rollup(year), 'الشهر'
+    else:
+        rows, label = get_yearly_rollup(), 'السنة'
+    if not rows:
+        st.info('لا توجد مصروفات بعد')
+        return
+
+    # one row per month or year, one column per category, known categories first
+    seen = {row[1] for row in rows}
+    columns = [c for c in categories if c in seen] + sorted(seen.difference(categories))
+    table = {}
+    for when, category, count, amount in rows:
+        table.setdefault(when, {label: when, **dict.fromkeys(columns, 0.0)})[category] = amount
+    data = list(table.values())
+    st.bar_chart(data, x=label, y=columns)
+    st.dataframe(data, hide_index=True,
+                 column_config={c: st.column_config.NumberColumn(format='%.2f') for c in columns})
+
+
+def analytics_panel():
+    """Spending by category, per week or month, and its trend."""
+    import analytics  # pandas is only imported when the page is opened
+
+    st.header('📈 التحليلات')
+    categories = analytics.by_category()
+    if categories.empty:
+        st.info('لا توجد مصروفات بعد')
+        return
+    st.subheader('حسب الفئة')
+    st.bar_chart(categories['total'])
+    st.dataframe(categories, column_config={'total': st.column_config.NumberColumn(format='%.2f'),
+                                            'share': st.column_config.NumberColumn(format='percent')})
+
+    frequency = st.radio('التجميع', analytics.FREQUENCIES, horizontal=True,
+                         format_func={'week': 'أسبوعي', 'month': 'شهري'}.get)
+    table = analytics.by_period(frequency)
+    if table.empty:
+        return
+    shown = st.multiselect('الفئات', list(table.columns), default=list(table.columns))
+    st.subheader('حسب الفترة')
+    st.bar_chart(table[shown])
+
+    st.subheader('الاتجاه')
+    trend, slope = analytics.trend(frequency)
+    st.line_chart(trend)
+    st.caption(f'{slope:+.2f} ﷼ لكل {"أسبوع" if frequency == "week" else "شهر"}')
+
+
+def api_token_panel():
+    """With RIYAL_API=1, issue tokens for the JSON API (phone shortcuts) or revoke them all."""
+    if not API_ENABLED:
+        return
+    st.subheader('🔑 API')
+    if st.button('إنشاء رمز جديد'):
+        # shown once: only its hash is kept
+        lines = [f'Authorization: Bearer {tokens.issue_token("settings page")}']
+        household = storage.current_tenant()
+        if household:
+            lines.append(f'X-Household: {household}')
+        st.code('\n'.join(lines), language=None)
+    if st.button('إلغاء كل الرموز'):
+        st.success(f'تم إلغاء {tokens.revoke_tokens()} رمز')
+
+
+def debug_sidebar(rerun, top=10):
+    """Finish ``rerun`` and, with RIYAL_METRICS=1, show where its time went in the sidebar."""
+    rerun.finish()
+    if not metrics.ENABLED:
+        return
+    with st.sidebar.expander('🐞 Debug'):
+        st.caption(f'{rerun.section}: {rerun.seconds * 1000:.1f} ms, {len(rerun.statements)} statements')
+        slowest = sorted(rerun.statements.items(), key=lambda item: item[1][2], reverse=True)[:top]
+        st.dataframe([{'SQL': sql, 'calls': calls, 'rows': rows, 'ms': round(seconds * 1000, 2)}
+                      for sql, (calls, rows, seconds) in slowest], hide_index=True)
+        st.dataframe([{'section': section, 'reruns': reruns, 'p50 ms': round(p50 * 1000, 1),
+                       'p99 ms': round(p99 * 1000, 1)}
+                      for section, (reruns, p50, p99) in metrics.registry.section_quantiles().items()],
+                     hide_index=True)
+        st.caption(f'http://{metrics.HOST}:{metrics.PORT}/metrics')